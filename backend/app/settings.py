@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,6 +91,95 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+# The default cache must be shared by all the processes serving the API,
+# it keeps the versions invalidating their in-memory caches and indexes of
+# users and the login throttle counts. Only a single process may serve the
+# API with the local memory cache, used when CACHE_LOCATION isn't set.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION'),
+    } if os.environ.get('CACHE_LOCATION') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'core.cache.LRUCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_BYTES': 64 * 1024 * 1024,
+        },
+    },
+}
+
+# JSON is encoded and decoded with orjson, MessagePack is offered too
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipes.renderers.FastJSONRenderer',
+        'recipes.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipes.parsers.FastJSONParser',
+        'recipes.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Login attempts, before any password is hashed. Attempts are counted in
+    # the default cache, which all the processes share.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_account': '10/min',
+    },
+    # Number of proxies in front of the API, clients are identified by the
+    # address the outermost one saw, read from X-Forwarded-For. With none
+    # the header is the client's own, so their address is used instead.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+# Responses of at least that many bytes are compressed with brotli or gzip
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Under ASGI, read endpoints with an async implementation query the database
+# by up to that many asynchronous connections per event loop
+ASYNC_DB_POOL_SIZE = 10
+
+# API tokens expire after that many seconds. Authenticated users are kept
+# in memory by token for AUTH_TOKEN_CACHE_TIMEOUT seconds at most, which
+# bounds how long changes made without model signals take to apply. Logout,
+# rotation and deactivation apply to other processes once they check the
+# user's version in the shared cache, every AUTH_TOKEN_VERSION_CHECK_INTERVAL
+# seconds at most.
+AUTH_TOKEN_TTL = 30 * 24 * 60 * 60
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+AUTH_TOKEN_CACHE_MAX_SIZE = 10000
+AUTH_TOKEN_VERSION_CHECK_INTERVAL = 5
+
+# Per-user cache of the list responses of the recipes API
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+
+# Passwords are hashed by a pool of PASSWORD_HASHING_WORKERS processes, run
+# at a lower priority, so bursts of sign-ups and logins don't take the CPU
+# of request workers. With 0 workers they're hashed inline.
+PASSWORD_HASHING_WORKERS = 2
+PASSWORD_HASHING_NICENESS = 10
+
+# Hashes are upgraded on login when the iterations change
+PASSWORD_HASH_ITERATIONS = 180000
+
+PASSWORD_HASHERS = [
+    'core.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -132,3 +223,38 @@ STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Number of users whose pantry index is kept in memory by every process
+PANTRY_INDEX_MAX_USERS = 1000
+
+# Text search configuration used for the recipe search vector
+RECIPE_SEARCH_CONFIG = 'english'
+
+# Number of users whose tag and ingredient names are kept in memory for
+# autocompletion by every process
+AUTOCOMPLETE_INDEX_MAX_USERS = 1000
+
+# Changes made during that many seconds before a sync are sent again by the
+# next sync, so writes committed late by long transactions are not missed
+SYNC_TOKEN_OVERLAP = 30
+
+# Tombstones of deleted records are kept that many seconds for syncing, the
+# prune_tombstones command deletes older ones. Clients with an older sync
+# token have to sync everything again.
+SYNC_TOMBSTONE_RETENTION = 90 * 24 * 60 * 60
+
+# Downscaled variants of uploaded recipe images, generated by a pool of
+# worker processes. With 0 workers they are generated during the upload.
+IMAGE_PROCESSING_WORKERS = 2
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_QUALITY = 80
+
+# Unreferenced images are deleted once not saved for that many seconds, so
+# uploads reusing them that aren't committed yet don't lose them
+IMAGE_COLLECT_GRACE = 60 * 60
+
+# Media files are served by Django unless their transfer is handed to the
+# front proxy: 'x-accel-redirect' for nginx, which serves them from an
+# internal location at MEDIA_ACCEL_REDIRECT_PREFIX, or 'x-sendfile'
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
@@ -0,0 +1,77 @@
+import logging
+
+from rest_framework.exceptions import APIException
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncViewMixin:
+    """Serve actions of a DRF view natively under ASGI
+
+    A view implements an action in the event loop with an `async_<action>`
+    coroutine method, `async_get` for views which aren't viewsets. The
+    request is authenticated by the authenticators' `authenticate_cached`
+    coroutine, which mustn't read the database. The method returns a
+    response or None to have the request served by the synchronous view,
+    like any request raising an exception, so errors are handled and
+    logged by Django the same on both paths. Blocking I/O, such as reads
+    of the shared cache, runs in a thread with `sync_to_async`.
+    """
+
+    async def authenticate_cached(self, request):
+        """Authenticate the request without reading the database, if able"""
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'authenticate_cached', None)
+            user_auth = await authenticate(request) if authenticate else None
+            if user_auth is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                return True
+
+        return False
+
+    async def async_dispatch(self, request, action, *args, **kwargs):
+        """Return the response of the action, or None to serve it in sync"""
+        self.args = args
+        self.kwargs = kwargs
+        self.action = action
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        if not await self.authenticate_cached(request):
+            return None
+        try:
+            self.initial(request, *args, **kwargs)
+            # The browsable API renders forms from the database
+            if request.accepted_renderer.format == 'api':
+                return None
+            handler = getattr(self, f'async_{action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as e:
+            # API exceptions are expected, others are likely database
+            # errors the synchronous view may not run into again
+            if not isinstance(e, APIException):
+                logger.warning(
+                    'Async %s of %s failed, served in sync', action,
+                    self.__class__.__name__, exc_info=True,
+                )
+            return None
+        if response is None:
+            return None
+
+        response = await self.async_finalize_response(
+            request, response, *args, **kwargs
+        )
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    async def async_finalize_response(self, request, response, *args,
+                                      **kwargs):
+        """Finalize the response, by the mixins doing I/O if there are any"""
+        finalize = getattr(super(), 'async_finalize_response', None)
+        if finalize is not None:
+            return await finalize(request, response, *args, **kwargs)
+        return self.finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,140 @@
+import asyncio
+import select
+import weakref
+
+import psycopg2
+import psycopg2.extensions
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+async def _wait(connection):
+    """Wait until an asynchronous connection completes its operation"""
+    loop = asyncio.get_running_loop()
+    fd = connection.fileno()
+    while True:
+        state = connection.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+
+        waiter = loop.create_future()
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fd, waiter.set_result, None)
+            remove = loop.remove_reader
+        else:
+            loop.add_writer(fd, waiter.set_result, None)
+            remove = loop.remove_writer
+        try:
+            await waiter
+        finally:
+            remove(fd)
+
+
+def is_usable(connection):
+    """Return whether an idle connection is still open
+
+    Nothing is sent to idle connections, data to read means the server
+    closed the connection, after a restart for one.
+    """
+    if connection.closed:
+        return False
+    readable, _, _ = select.select([connection.fileno()], [], [], 0)
+    return not readable
+
+
+class AsyncConnectionPool:
+    """Pool of asynchronous psycopg2 connections of an event loop
+
+    Connections are opened with the parameters of the Django connection
+    `alias` and are in autocommit mode, so they only see committed data.
+    At most ASYNC_DB_POOL_SIZE of them are open, further queries wait for
+    a connection to be released.
+    """
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        self.alias = alias
+        self.idle = []
+        self.semaphore = asyncio.Semaphore(settings.ASYNC_DB_POOL_SIZE)
+
+    async def connect(self):
+        wrapper = connections[self.alias]
+        connection = psycopg2.connect(
+            **wrapper.get_connection_params(), async_=True
+        )
+        await _wait(connection)
+        if settings.USE_TZ:
+            cursor = connection.cursor()
+            cursor.execute('SET TIME ZONE %s', [wrapper.timezone_name])
+            await _wait(connection)
+        return connection
+
+    async def acquire(self):
+        """Return an idle connection still open, or a new one"""
+        while self.idle:
+            connection = self.idle.pop()
+            if is_usable(connection):
+                return connection
+            connection.close()
+        return await self.connect()
+
+    async def fetch(self, sql, params):
+        """Return the rows of a query, as tuples"""
+        async with self.semaphore:
+            connection = await self.acquire()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(sql, params)
+                await _wait(connection)
+                rows = cursor.fetchall()
+            except BaseException:
+                # A cancelled or failed query leaves the connection in an
+                # unknown state
+                connection.close()
+                raise
+            self.idle.append(connection)
+            return rows
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    """Return the connection pool of the running event loop"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = AsyncConnectionPool()
+    return pool
+
+
+async def fetch_values(queryset):
+    """Evaluate a values() queryset without blocking the event loop
+
+    Returns the rows as dicts, like iterating over the queryset does. The
+    SQL is compiled by the ORM, which doesn't touch the database.
+    """
+    compiler = queryset.query.get_compiler(queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return []
+
+    rows = await get_pool().fetch(sql, params)
+    converters = compiler.get_converters(
+        [expression for expression, _, _ in compiler.select]
+    )
+    if converters:
+        rows = compiler.apply_converters(rows, converters)
+
+    query = queryset.query
+    names = [
+        *query.extra_select,
+        *query.values_select,
+        *query.annotation_select,
+    ]
+    return [dict(zip(names, row)) for row in rows]
@@ -0,0 +1,58 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# Sizes of the stored values of every named cache, shared like the data
+# of LocMemCache as cache objects are created per thread.
+_sizes = {}
+
+
+class _Sizes:
+
+    def __init__(self):
+        self.by_key = {}
+        self.total = 0
+
+
+class LRUCache(LocMemCache):
+    """Local memory cache bounded by the size of the stored values
+
+    Least recently used entries are evicted once the pickled values take
+    more than the `MAX_BYTES` option (64 MiB by default).
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        options = params.get('OPTIONS', {})
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._sizes = _sizes.setdefault(name, _Sizes())
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._delete(key)
+        super()._set(key, value, timeout)
+        self._sizes.by_key[key] = len(value)
+        self._sizes.total += len(value)
+        while self._sizes.total > self._max_bytes and len(self._cache) > 1:
+            self._delete(next(reversed(self._cache)))
+
+    def _cull(self):
+        if self._cull_frequency == 0:
+            self._clear()
+            return
+
+        for i in range(len(self._cache) // self._cull_frequency):
+            self._delete(next(reversed(self._cache)))
+
+    def _delete(self, key):
+        super()._delete(key)
+        self._sizes.total -= self._sizes.by_key.pop(key, 0)
+
+    def _clear(self):
+        self._cache.clear()
+        self._expire_info.clear()
+        self._sizes.by_key.clear()
+        self._sizes.total = 0
+
+    def clear(self):
+        with self._lock:
+            self._clear()
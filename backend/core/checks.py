@@ -0,0 +1,21 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Check the default cache is shared by the processes serving the API
+
+    It keeps the versions invalidating the token cache and the in-memory
+    indexes of every process, and the counts of the login throttles.
+    """
+    if not isinstance(caches['default'], LocMemCache):
+        return []
+
+    message = 'The default cache is local to each process.'
+    hint = 'Set CACHE_LOCATION to a memcached server shared by all the ' \
+        'processes serving the API, otherwise changes made through one ' \
+        'of them are missed by the others.'
+    # A warning, the development server and the tests run a single process
+    return [Warning(message, hint=hint, id='core.W001')]
@@ -0,0 +1,145 @@
+import re
+import zlib
+
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+# Encodings in the order of preference
+ENCODINGS = ('br', 'gzip')
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'text/',
+    'application/json',
+    'application/jsonl',
+    'application/x-ndjson',
+    'application/msgpack',
+    'application/javascript',
+    'application/xml',
+)
+
+ACCEPT_ENCODING_RE = re.compile(
+    r'^\s*([^\s;]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$'
+)
+
+
+def accepted_encoding(request):
+    """Return the preferred encoding the request accepts, if any"""
+    accepted = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        match = ACCEPT_ENCODING_RE.match(coding)
+        if match is None:
+            continue
+        name, quality = match.groups()
+        try:
+            accepted[name.lower()] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+
+    default = accepted.get('*', 0)
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, default) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(response):
+    """Return whether the response is worth compressing, whatever its size"""
+    if response.has_header('Content-Encoding') or \
+            response.status_code == 206 or \
+            response.has_header('Content-Range'):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(
+            content, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    return compress_string(content)
+
+
+def compress_stream(chunks, encoding):
+    """Compress chunks, flushing after each one so none waits for the next"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+        process, flush = compressor.process, compressor.flush
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def set_encoding(response, encoding):
+    """Set the headers of a response compressed with `encoding`
+
+    A strong ETag becomes weak, like Django's GZipMiddleware does, as the
+    representation is no longer byte for byte the same.
+    """
+    response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding', ))
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = f'W/{etag}'
+
+
+def compress_response(response, encoding):
+    """Compress content of a response in place, if it gets any smaller
+
+    Returns whether it was compressed.
+    """
+    if response.streaming:
+        response.streaming_content = compress_stream(
+            response.streaming_content, encoding
+        )
+        del response['Content-Length']
+    else:
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return False
+        content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return False
+        response.content = content
+        response['Content-Length'] = str(len(content))
+
+    set_encoding(response, encoding)
+    return True
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, whichever the client prefers
+
+    Responses smaller than COMPRESSION_MIN_SIZE, of content types which
+    don't compress and partial ones are sent as they are. Streaming
+    responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not is_compressible(response):
+            return response
+
+        # The response depends on Accept-Encoding even when not compressed
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        encoding = accepted_encoding(request)
+        if encoding is not None:
+            compress_response(response, encoding)
+
+        return response
@@ -0,0 +1,60 @@
+MERGED_NAMES = {
+    # model: (table, recipe link table, link column)
+    'tag': ('core_tag', 'core_recipe_tags', 'tag_id'),
+    'ingredient': (
+        'core_ingredient', 'core_recipe_ingredients', 'ingredient_id'
+    ),
+}
+
+
+def merge_duplicate_names(cursor, model):
+    """Merge tags or ingredients of a user differing only by letter case
+
+    The oldest row of every group is kept. Recipes linked to the others
+    are linked to it instead, touched so they're synced again, and the
+    others are deleted, leaving tombstones. Everything is done by a few
+    statements over all users, which should run in a transaction, and
+    `model` is 'tag' or 'ingredient'. Returns ids of the users whose rows
+    were merged and number of the deleted rows.
+    """
+    table, link_table, column = MERGED_NAMES[model]
+    cursor.execute(
+        f'CREATE TEMPORARY TABLE merged_names AS '
+        f'SELECT id, keeper_id, user_id FROM ('
+        f'  SELECT id, user_id, first_value(id) OVER ('
+        f'    PARTITION BY user_id, upper(name) ORDER BY id'
+        f'  ) AS keeper_id FROM {table}'
+        f') AS names WHERE id <> keeper_id'
+    )
+    cursor.execute(
+        f'UPDATE core_recipe SET updated_at = clock_timestamp() WHERE id IN ('
+        f'  SELECT recipe_id FROM {link_table} '
+        f'  JOIN merged_names ON {column} = merged_names.id'
+        f')'
+    )
+    cursor.execute(
+        f'INSERT INTO {link_table} (recipe_id, {column}) '
+        f'SELECT DISTINCT recipe_id, keeper_id FROM {link_table} '
+        f'JOIN merged_names ON {column} = merged_names.id '
+        f'ON CONFLICT DO NOTHING'
+    )
+    cursor.execute(
+        f'DELETE FROM {link_table} USING merged_names '
+        f'WHERE {column} = merged_names.id'
+    )
+    cursor.execute(
+        f'DELETE FROM {table} USING merged_names '
+        f'WHERE {table}.id = merged_names.id'
+    )
+    cursor.execute(
+        'INSERT INTO core_tombstone (user_id, model, object_id, deleted_at) '
+        'SELECT user_id, %s, id, clock_timestamp() FROM merged_names',
+        [model]
+    )
+    cursor.execute('SELECT DISTINCT user_id FROM merged_names')
+    user_ids = [user_id for user_id, in cursor.fetchall()]
+    cursor.execute('SELECT count(*) FROM merged_names')
+    merged, = cursor.fetchone()
+    cursor.execute('DROP TABLE merged_names')
+
+    return user_ids, merged
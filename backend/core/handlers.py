@@ -0,0 +1,134 @@
+import django
+from asgiref.sync import sync_to_async
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.http import FileResponse
+from django.urls import Resolver404, resolve, set_script_prefix
+
+from core.async_views import AsyncViewMixin
+
+
+class AsyncViewsASGIHandler(ASGIHandler):
+    """ASGI handler serving async actions of views in the event loop
+
+    GET requests of views with an async implementation of their action,
+    see `AsyncViewMixin`, are answered without the thread hop of Django's
+    handler. The database is read by an async driver, while reads of the
+    shared cache still run in a thread. The middleware then runs in the
+    event loop on the response, none of the project's does I/O. Other
+    requests, and those the async action declines, are handled by Django
+    in a thread as usual.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError(
+                f'Django can only handle ASGI/HTTP connections, not '
+                f'{scope["type"]}.'
+            )
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        set_script_prefix(self.get_script_prefix(scope))
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            await self.send_response(error_response, send)
+            return
+
+        response = await self.get_async_response(request)
+        if response is None:
+            await sync_to_async(signals.request_started.send)(
+                sender=self.__class__, scope=scope
+            )
+            # In the thread streaming content is iterated in, see below
+            response = await sync_to_async(
+                self.get_response, thread_sensitive=True
+            )(request)
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+        await self.send_response(response, send)
+
+    async def send_response(self, response, send):
+        """Send the response, streaming content is iterated in a thread
+
+        Django iterates it in the event loop, where generators reading the
+        database, such as the export's cursor, can't run.
+        """
+        if not response.streaming:
+            await super().send_response(response, send)
+            return
+
+        response_headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            response_headers.append((
+                b'Set-Cookie', cookie.output(header='').encode('ascii').strip()
+            ))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        try:
+            while True:
+                part = await next_part(parts, None)
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
+
+    async def get_async_response(self, request):
+        """Return the response of the view's async action, if it has one"""
+        if request.method != 'GET':
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+
+        view_class = getattr(match.func, 'cls', None)
+        if view_class is None or not issubclass(view_class, AsyncViewMixin):
+            return None
+        actions = getattr(match.func, 'actions', None)
+        action = actions.get('get') if actions else 'get'
+        if action is None or not hasattr(view_class, f'async_{action}'):
+            return None
+
+        view = view_class(**match.func.initkwargs)
+        if actions:
+            view.action_map = actions
+        request.resolver_match = match
+        response = await view.async_dispatch(
+            request, action, *match.args, **match.kwargs
+        )
+        if response is None:
+            return None
+
+        request.async_response = response
+        return self.get_response(request)
+
+    def _get_response(self, request):
+        response = getattr(request, 'async_response', None)
+        if response is not None:
+            return response
+        return super()._get_response(request)
+
+
+def get_asgi_application():
+    """Return the project's ASGI callable, like Django's function does"""
+    django.setup(set_prefix=False)
+    return AsyncViewsASGIHandler()
@@ -0,0 +1,101 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 hasher with PASSWORD_HASH_ITERATIONS iterations
+
+    It keeps the algorithm name of Django's hasher, so existing hashes are
+    verified by it and upgraded on login once the iterations change.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+_lock = threading.Lock()
+_executor = None
+_executor_workers = None
+
+
+def _forget_executor():
+    global _executor, _executor_workers
+    _executor = None
+    _executor_workers = None
+
+
+# A forked process doesn't get the pool's processes, only its handle
+os.register_at_fork(after_in_child=_forget_executor)
+
+
+def _init_worker(niceness):
+    if niceness:
+        os.nice(niceness)
+
+
+def get_executor():
+    """Return the pool hashing passwords, None when they're hashed inline"""
+    global _executor, _executor_workers
+    workers = settings.PASSWORD_HASHING_WORKERS
+    if not workers:
+        return None
+
+    with _lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(
+                workers,
+                initializer=_init_worker,
+                initargs=(settings.PASSWORD_HASHING_NICENESS, ),
+            )
+            _executor_workers = workers
+        return _executor
+
+
+def _run(function, *args):
+    executor = get_executor()
+    if executor is not None:
+        try:
+            return executor.submit(function, *args).result()
+        except BrokenProcessPool:
+            with _lock:
+                if _executor is executor:
+                    _forget_executor()
+
+    return function(*args)
+
+
+def _check_password(password, encoded):
+    updates = []
+    valid = hashers.check_password(password, encoded, updates.append)
+    return valid, bool(updates)
+
+
+def make_password(password):
+    """Hash a password like Django's make_password, in the hashing pool"""
+    if password is None:
+        return hashers.make_password(None)
+    return _run(hashers.make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    """Check a password like Django's check_password, in the hashing pool
+
+    `setter` is called with the password when its hash needs an upgrade to
+    the preferred hasher or to its current work factor.
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+
+    valid, must_update = _run(_check_password, password, encoded)
+    if must_update and setter:
+        setter(password)
+    return valid
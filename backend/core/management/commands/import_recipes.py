@@ -0,0 +1,275 @@
+import csv
+import io
+import json
+import sys
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Ingredient, Recipe, Tag
+from recipes.bulk import invalidate_user_indexes
+from recipes.names import get_or_create_names
+
+
+class NameResolver:
+    """Map tag or ingredient names of a user to ids, creating missing rows
+
+    Names are matched regardless of case, like they're unique. Ids are kept
+    in a bounded LRU by name, so memory doesn't grow with the number of
+    distinct names in the file.
+    """
+
+    def __init__(self, model, user, max_names):
+        self.model = model
+        self.user = user
+        self.max_names = max_names
+        self.ids = OrderedDict()
+        self.created = 0
+
+    def resolve(self, names):
+        missing = [name for name in names if name not in self.ids]
+        found, created = get_or_create_names(self.model, self.user, missing)
+        for name, id_ in found.items():
+            self._remember(name, id_)
+        self.created += created
+
+        ids = {}
+        for name in names:
+            self.ids.move_to_end(name)
+            ids[name] = self.ids[name]
+        while len(self.ids) > self.max_names:
+            self.ids.popitem(last=False)
+
+        return ids
+
+    def _remember(self, name, id_):
+        self.ids[name] = id_
+        self.ids.move_to_end(name)
+
+
+def copy_rows(model, columns, rows):
+    """Write rows of integers to the table of `model` with COPY
+
+    Used for the many-to-many rows, which are the bulk of an import and
+    need no ids back.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(map(str, row)))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+            f'({", ".join(columns)}) FROM STDIN',
+            buffer
+        )
+
+
+def read_jsonl(f):
+    """Read JSON objects, one per line
+
+    Lines that aren't a JSON object are returned as None.
+    """
+    for line, text in enumerate(f, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
+
+
+def read_csv(f, separator):
+    """Read CSV rows, tags and ingredients are `separator` joined names"""
+    reader = csv.DictReader(f)
+    for row in reader:
+        for field in ('tags', 'ingredients'):
+            names = row.get(field) or ''
+            row[field] = [
+                name for name in names.split(separator) if name.strip()
+            ]
+        yield reader.line_num, row
+
+
+class Command(BaseCommand):
+    """Command that imports recipes of a user from a JSONL or CSV file
+
+    Rows are read lazily and written in batches with `bulk_create` and
+    COPY, so the memory used doesn't depend on the size of the file. Bulk
+    writes skip model signals, so the search vectors and the in-memory
+    indexes and cached responses of the user are updated here instead.
+    """
+    help = 'Import recipes of a user from a JSONL or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, - for stdin')
+        parser.add_argument('--user', required=True, help='Email of the user')
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Format of the file, guessed from its extension by default',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--separator',
+            default=';',
+            help='Separator of tag and ingredient names in CSV files',
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Report invalid rows and go on instead of stopping',
+        )
+        parser.add_argument(
+            '--max-names',
+            type=int,
+            default=100000,
+            help='Number of tag and ingredient ids kept in memory',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist')
+
+        self.skip_invalid = options['skip_invalid']
+        self.tags = NameResolver(Tag, self.user, options['max_names'])
+        self.ingredients = NameResolver(
+            Ingredient, self.user, options['max_names']
+        )
+        self.imported = 0
+        self.invalid = 0
+
+        path = options['path']
+        file_format = options['format'] or \
+            ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        f = sys.stdin if path == '-' else open(path, newline='')
+        started = time.monotonic()
+        try:
+            if file_format == 'csv':
+                rows = read_csv(f, options['separator'])
+            else:
+                rows = read_jsonl(f)
+            self.import_rows(rows, options['batch_size'], started)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+            if self.imported:
+                invalidate_user_indexes(self.user.id)
+
+        summary = f'Imported {self.imported} recipes ' \
+            f'in {time.monotonic() - started:.1f}s, ' \
+            f'created {self.tags.created} tags ' \
+            f'and {self.ingredients.created} ingredients'
+        if self.invalid:
+            summary += f', skipped {self.invalid} invalid rows'
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def import_rows(self, rows, batch_size, started):
+        recipes = self.clean_rows(rows)
+        while True:
+            batch = list(islice(recipes, batch_size))
+            if not batch:
+                break
+
+            self.import_batch(batch)
+            self.imported += len(batch)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'Imported {self.imported} recipes '
+                f'({self.imported / max(elapsed, 1e-6):.0f}/s)'
+            )
+
+    def clean_rows(self, rows):
+        fields = {
+            name: Recipe._meta.get_field(name)
+            for name in ('title', 'time_minutes', 'price_dolars')
+        }
+        max_name_length = Tag._meta.get_field('name').max_length
+        for line, row in rows:
+            if row is None:
+                self.reject(line, 'expected a JSON object')
+                continue
+
+            try:
+                values = {
+                    name: field.clean(row.get(name), None)
+                    for name, field in fields.items()
+                }
+                names = {}
+                for related in ('tags', 'ingredients'):
+                    related_names = row.get(related) or []
+                    if not isinstance(related_names, list):
+                        raise ValidationError(f'{related} must be a list')
+                    names[related] = list(dict.fromkeys(
+                        name.strip() for name in map(str, related_names)
+                        if name.strip()
+                    ))
+                    if any(len(name) > max_name_length
+                           for name in names[related]):
+                        raise ValidationError(
+                            f'{related} names must have at most '
+                            f'{max_name_length} characters'
+                        )
+            except ValidationError as e:
+                self.reject(line, '; '.join(e.messages))
+                continue
+
+            yield Recipe(user=self.user, **values), \
+                names['tags'], names['ingredients']
+
+    def reject(self, line, message):
+        error = f'Line {line}: {message}'
+        if not self.skip_invalid:
+            raise CommandError(
+                f'{error}, {self.imported} recipes imported before it'
+            )
+        self.invalid += 1
+        self.stderr.write(error)
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        # Names in order, so the first spelling of a new one is kept
+        tag_ids = self.tags.resolve(dict.fromkeys(
+            name for _, tags, _ in batch for name in tags
+        ))
+        ingredient_ids = self.ingredients.resolve(dict.fromkeys(
+            name for _, _, ingredients in batch for name in ingredients
+        ))
+
+        recipes = Recipe.objects.bulk_create(
+            recipe for recipe, _, _ in batch
+        )
+        copy_rows(
+            Recipe.tags.through,
+            ('recipe_id', 'tag_id'),
+            (
+                (recipe.id, tag_id)
+                for recipe, (_, tags, _) in zip(recipes, batch)
+                # Names differing in case only are the same tag
+                for tag_id in dict.fromkeys(tag_ids[name] for name in tags)
+            )
+        )
+        copy_rows(
+            Recipe.ingredients.through,
+            ('recipe_id', 'ingredient_id'),
+            (
+                (recipe.id, ingredient_id)
+                for recipe, (_, _, ingredients) in zip(recipes, batch)
+                for ingredient_id in dict.fromkeys(
+                    ingredient_ids[name] for name in ingredients
+                )
+            )
+        )
+        Recipe.objects \
+            .filter(pk__in=[recipe.id for recipe in recipes]) \
+            .update_search_vector()
@@ -0,0 +1,49 @@
+# Generated by Django 3.0.14 on 2026-10-17 03:51
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+BACKFILL_SEARCH_VECTOR = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector(%s::regconfig, title), 'A') ||
+    setweight(to_tsvector(%s::regconfig, COALESCE((
+        SELECT string_agg(t.name, ' ')
+        FROM core_tag t JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = core_recipe.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%s::regconfig, COALESCE((
+        SELECT string_agg(i.name, ' ')
+        FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = core_recipe.id
+    ), '')), 'B');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_m2m_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+        migrations.RunSQL(
+            [(
+                BACKFILL_SEARCH_VECTOR,
+                [settings.RECIPE_SEARCH_CONFIG] * 3,
+            )],
+            migrations.RunSQL.noop,
+        ),
+    ]
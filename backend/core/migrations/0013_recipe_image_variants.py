@@ -0,0 +1,24 @@
+# Generated by Django 3.0.14 on 2026-10-17 04:01
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], max_length=16),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=django.contrib.postgres.fields.jsonb.JSONField(default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.14 on 2026-10-17 04:04
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_path),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['image'], name='core_recipe_image_idx'),
+        ),
+    ]
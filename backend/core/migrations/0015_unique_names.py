@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from core.dedupe import merge_duplicate_names
+
+
+def merge_duplicates(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        merge_duplicate_names(cursor, 'tag')
+        merge_duplicate_names(cursor, 'ingredient')
+        # Checks of the deferred foreign keys would otherwise be pending
+        # when the indexes are created, which Postgres refuses
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_tag_user_upper_name_uniq '
+            'ON core_tag (user_id, upper(name));',
+            'DROP INDEX core_tag_user_upper_name_uniq;',
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX core_ingr_user_upper_name_uniq '
+            'ON core_ingredient (user_id, upper(name));',
+            'DROP INDEX core_ingr_user_upper_name_uniq;',
+        ),
+    ]
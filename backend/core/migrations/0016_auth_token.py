@@ -0,0 +1,51 @@
+# Generated by Django 3.0.14 on 2026-10-17 04:42
+
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def hash_existing_tokens(apps, schema_editor):
+    """Replace plaintext tokens by hashed ones, valid for a full TTL"""
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('core', 'AuthToken')
+    expires_at = datetime.datetime.now(datetime.timezone.utc) + \
+        datetime.timedelta(seconds=settings.AUTH_TOKEN_TTL)
+    AuthToken.objects.bulk_create(
+        AuthToken(
+            key_hash=hashlib.sha256(token.key.encode('utf-8')).hexdigest(),
+            user_id=token.user_id,
+            expires_at=expires_at,
+        )
+        for token in Token.objects.iterator()
+    )
+    Token.objects.all().delete()
+
+
+def drop_hashed_tokens(apps, schema_editor):
+    """Hashed keys can't be turned back into tokens, users log in again"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_unique_names'),
+        ('authtoken', '0002_auto_20160226_1747'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(hash_existing_tokens, drop_hashed_tokens),
+    ]
@@ -1,11 +1,20 @@
+import hashlib
 import os
-import uuid
+import secrets
 
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.conf import settings
+from django.utils import timezone
+
+from core import hashers
+from core.storage import ContentAddressedStorage
 
 
 class UserManager(BaseUserManager):
@@ -41,14 +50,41 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        self.password = hashers.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Check the password, upgrading its hash if outdated"""
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Hash upgrades aren't password changes
+            self._password = None
+            self.save(update_fields=['password'])
+        return hashers.check_password(raw_password, self.password, setter)
+
 
 class Tag(models.Model):
 
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Names are also unique per user regardless of case, by the
+        # core_tag_user_upper_name_uniq index on (user_id, upper(name))
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'], name='core_tag_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at'], name='core_tag_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -59,21 +95,69 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Names are also unique per user regardless of case, by the
+        # core_ingr_user_upper_name_uniq index on (user_id, upper(name))
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'], name='core_ingr_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_ingr_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
 def recipe_image_path(instance, filename):
+    """Return the directory and extension, the storage names by content"""
     _, ext = os.path.splitext(filename)
-    filename = f'{uuid.uuid4()}{ext}'
 
-    return os.path.join('uploads/recipes/', filename)
+    return os.path.join('uploads/recipes/', ext.lower())
+
+
+def _related_names(model):
+    return models.Subquery(
+        model.objects.filter(recipe=models.OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names'),
+        output_field=models.TextField(),
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def update_search_vector(self, **fields):
+        """Recompute search vector of recipes in a single UPDATE
+
+        Extra `fields` are updated by the same statement.
+        """
+        config = settings.RECIPE_SEARCH_CONFIG
+        return self.update(search_vector=(
+            SearchVector('title', weight='A', config=config) +
+            SearchVector(_related_names(Tag), weight='B', config=config) +
+            SearchVector(_related_names(Ingredient), weight='B', config=config)
+        ), **fields)
 
 
 class Recipe(models.Model):
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
 
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
@@ -81,11 +165,118 @@ class Recipe(models.Model):
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_path,
+        storage=ContentAddressedStorage(),
+    )
+    image_status = models.CharField(
+        max_length=16, choices=IMAGE_STATUS_CHOICES, blank=True
+    )
+    image_variants = JSONField(default=dict, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='core_recipe_user_title_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_recipe_user_updated_idx'
+            ),
+            models.Index(fields=['image'], name='core_recipe_image_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class Tombstone(models.Model):
+    """Record of a deleted recipe, tag or ingredient kept for syncing
+
+    The user isn't a database constraint, so tombstones can be written
+    while the user itself is being deleted. They're removed right after.
+    """
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    MODEL_CHOICES = (
+        (RECIPE, 'Recipe'),
+        (TAG, 'Tag'),
+        (INGREDIENT, 'Ingredient'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+    )
+    model = models.CharField(max_length=16, choices=MODEL_CHOICES)
+    object_id = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'deleted_at'],
+                name='core_tombstone_user_del_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+
+def hash_token_key(key):
+    """Return the hash an API token is stored by"""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class AuthTokenManager(models.Manager):
+
+    def create_token(self, user):
+        """Create an API token of the user, returns it and its key
+
+        Only the hash of the key is stored, it can't be read again.
+        """
+        key = secrets.token_urlsafe(32)
+        token = self.create(
+            user=user,
+            key_hash=hash_token_key(key),
+            expires_at=timezone.now() + timezone.timedelta(
+                seconds=settings.AUTH_TOKEN_TTL
+            ),
+        )
+        return token, key
+
+
+class AuthToken(models.Model):
+    """API token of a user, stored hashed, which expires"""
+    key_hash = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='auth_tokens',
+        on_delete=models.CASCADE,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    objects = AuthTokenManager()
+
+    def has_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def __str__(self):
+        return f'Token of user {self.user_id}'
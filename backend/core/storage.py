@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage keeping each content once under its hash
+
+    Saved files are named by the SHA-256 of their content, computed while
+    they are streamed to disk, in a directory sharded by the hash prefix.
+    The file name asked for only gives the directory and the extension.
+    Saving a content that's already stored returns the existing name and
+    updates its modification time, so files are shared and may only be
+    deleted once nothing refers to them and they weren't saved recently.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        # Leading dot included, the name may be the extension alone
+        _, ext = os.path.splitext(f'file{basename}')
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=full_directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            hexdigest = digest.hexdigest()
+            name = os.path.join(
+                directory, hexdigest[:2], f'{hexdigest}{ext.lower()}'
+            )
+            full_path = self.path(name)
+            try:
+                # Touched, so collectors keeping recent files keep it
+                # while the upload reusing it isn't committed
+                os.utime(full_path)
+                os.remove(temp_path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return name.replace('\\', '/')
@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from core.cache import LRUCache
+
+
+class LRUCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = LRUCache('test-lru', {
+            'OPTIONS': {'MAX_BYTES': 1000},
+        })
+        self.cache.clear()
+
+    def test_evicts_least_recently_used_over_max_bytes(self):
+        """Test the least recently used values are evicted first"""
+        self.cache.set('a', 'a' * 400)
+        self.cache.set('b', 'b' * 400)
+        self.cache.get('a')
+
+        self.cache.set('c', 'c' * 400)
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_replacing_and_deleting_frees_size(self):
+        for i in range(10):
+            self.cache.set('a', str(i) * 400)
+        self.cache.set('b', 'b' * 400)
+        self.assertIsNotNone(self.cache.get('a'))
+
+        self.cache.delete('a')
+        self.cache.set('c', 'c' * 400)
+        self.assertIsNotNone(self.cache.get('b'))
@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_shared_cache
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    @override_settings(DEBUG=False, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_local_cache_warned(self):
+        errors = check_shared_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.W001'])
+        self.assertFalse(errors[0].is_serious())
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }})
+    def test_other_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
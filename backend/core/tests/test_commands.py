@@ -1,9 +1,19 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Ingredient, Recipe, Tag
+from recipes import autocomplete
+from recipes.pantry import indexes
+
 
 class ComandTests(TestCase):
 
@@ -21,3 +31,170 @@ class ComandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test_password'
+        )
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, filename, content):
+        path = os.path.join(self.directory.name, filename)
+        with open(path, 'w', newline='') as f:
+            f.write(content)
+        return path
+
+    def import_recipes(self, path, *args):
+        stdout = StringIO()
+        call_command(
+            'import_recipes', path, '--user', self.user.email, *args,
+            stdout=stdout, stderr=StringIO()
+        )
+        return stdout.getvalue()
+
+    def test_import_jsonl(self):
+        """Test importing recipes with their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        rows = [
+            {
+                'title': 'Tofu curry',
+                'time_minutes': 30,
+                'price_dolars': '7.50',
+                'tags': ['Vegan', 'Dinner'],
+                'ingredients': ['Tofu', 'Rice'],
+            },
+            {
+                'title': 'Rice pudding',
+                'time_minutes': 20,
+                'price_dolars': 3,
+                'tags': ['Dinner'],
+                'ingredients': ['Rice'],
+            },
+        ]
+        path = self.write(
+            'recipes.jsonl', '\n'.join(json.dumps(row) for row in rows)
+        )
+
+        self.import_recipes(path, '--batch-size', '1')
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('title')
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            ['Rice pudding', 'Tofu curry']
+        )
+        curry = recipes[1]
+        self.assertEqual(curry.price_dolars, Decimal('7.50'))
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Dinner', 'Vegan']
+        )
+        self.assertIn(tag, curry.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2
+        )
+        self.assertEqual(
+            list(Recipe.objects.filter(search_vector='curry')), [curry]
+        )
+
+    def test_import_csv(self):
+        path = self.write(
+            'recipes.csv',
+            'title,time_minutes,price_dolars,tags,ingredients\n'
+            'Pancakes,15,4.00,Breakfast;Sweet,Flour;Milk;Egg\n'
+        )
+
+        self.import_recipes(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Pancakes')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.count(), 3)
+
+    def test_import_matches_names_ignoring_case(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        path = self.write(
+            'recipes.jsonl',
+            '{"title": "Soup", "time_minutes": 10, "price_dolars": 2, '
+            '"tags": ["vegan", "VEGAN", "Dinner"]}\n'
+            '{"title": "Stew", "time_minutes": 10, "price_dolars": 2, '
+            '"tags": ["dinner"]}\n'
+        )
+
+        self.import_recipes(path)
+
+        self.assertEqual(
+            sorted(Tag.objects.values_list('name', flat=True)),
+            ['Dinner', 'Vegan']
+        )
+        soup = Recipe.objects.get(title='Soup')
+        self.assertEqual(soup.tags.count(), 2)
+        self.assertIn(tag, soup.tags.all())
+
+    def test_import_matches_names_folded_by_database(self):
+        tag = Tag.objects.create(user=self.user, name='Straße')
+        path = self.write(
+            'recipes.jsonl',
+            '{"title": "Bratwurst", "time_minutes": 10, "price_dolars": 2, '
+            '"tags": ["straße", "STRASSE"]}\n'
+        )
+
+        self.import_recipes(path)
+
+        recipe = Recipe.objects.get(title='Bratwurst')
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Straße', 'STRASSE'}
+        )
+        self.assertIn(tag, recipe.tags.all())
+
+    def test_import_invalid_row(self):
+        path = self.write(
+            'recipes.jsonl',
+            '{"title": "Soup", "time_minutes": 10, "price_dolars": 2}\n'
+            '{"title": "Stew", "time_minutes": "long", "price_dolars": 2}\n'
+        )
+
+        with self.assertRaisesRegex(CommandError, 'Line 2'):
+            self.import_recipes(path)
+        self.assertFalse(Recipe.objects.exists())
+
+        self.import_recipes(path, '--skip-invalid')
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Soup']
+        )
+
+    def test_import_updates_indexes(self):
+        """Test indexes skipped by bulk writes are updated"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        pantry = indexes.get(self.user.id)
+        names = autocomplete.ingredient_indexes.get(self.user.id)
+        path = self.write(
+            'recipes.jsonl',
+            '{"title": "Soup", "time_minutes": 10, "price_dolars": 2, '
+            '"ingredients": ["Salt", "Water"]}\n'
+        )
+
+        self.import_recipes(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertIsNot(indexes.get(self.user.id), pantry)
+        self.assertEqual(
+            indexes.get(self.user.id).ingredients_of(recipe.id),
+            set(recipe.ingredients.values_list('id', flat=True))
+        )
+        self.assertIsNot(
+            autocomplete.ingredient_indexes.get(self.user.id), names
+        )
+
+    def test_import_unknown_user(self):
+        path = self.write('recipes.jsonl', '')
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, '--user', 'no@gmail.com')
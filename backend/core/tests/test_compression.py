@@ -0,0 +1,132 @@
+import gzip
+import os
+import tempfile
+from unittest.mock import patch
+
+import brotli
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.compression import accepted_encoding
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipes:recipe-list')
+EXPORT_URL = reverse('recipes:recipe-export')
+
+
+def accept(header):
+    return accepted_encoding(
+        RequestFactory().get('/', HTTP_ACCEPT_ENCODING=header)
+    )
+
+
+class AcceptedEncodingTests(SimpleTestCase):
+
+    def test_brotli_preferred(self):
+        self.assertEqual(accept('gzip, deflate, br'), 'br')
+
+    def test_refused_encodings(self):
+        self.assertEqual(accept('gzip, br;q=0'), 'gzip')
+        self.assertEqual(accept('gzip;q=0, br;q=0.0'), None)
+        self.assertEqual(accept('identity'), None)
+        self.assertEqual(accept(''), None)
+
+    def test_any_encoding(self):
+        self.assertEqual(accept('*'), 'br')
+        self.assertEqual(accept('br;q=0, *;q=0.5'), 'gzip')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class CompressionMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user, title=f'Recipe {i}', time_minutes=5,
+                price_dolars=1,
+            )
+            for i in range(50)
+        )
+
+    def test_brotli_response(self):
+        content = self.client.get(RECIPES_URL).content
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertLess(len(res.content), len(content))
+        self.assertEqual(brotli.decompress(res.content), content)
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertTrue(res['ETag'].startswith('W/"'))
+
+    def test_gzip_response(self):
+        content = self.client.get(RECIPES_URL).content
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), content)
+
+    def test_conditional_request_with_weak_etag(self):
+        etag = self.client.get(
+            RECIPES_URL, HTTP_ACCEPT_ENCODING='br'
+        )['ETag']
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_small_response_not_compressed(self):
+        with override_settings(COMPRESSION_MIN_SIZE=10 ** 6):
+            res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='br')
+
+        self.assertNotIn('Content-Encoding', res)
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_streaming_response_compressed_by_chunks(self):
+        content = b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+        with patch('recipes.views.RecipeViewSet.export_chunk_size', 10):
+            res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+            chunks = list(res.streaming_content)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', res)
+        self.assertGreater(len(chunks), 5)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), content)
+
+    def test_images_and_partial_content_not_compressed(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(MEDIA_ROOT=directory):
+            for name in ('image.jpg', 'notes.txt'):
+                with open(os.path.join(directory, name), 'wb') as f:
+                    f.write(b'0' * 4096)
+
+            image = self.client.get(
+                reverse('media', args=['image.jpg']),
+                HTTP_ACCEPT_ENCODING='br',
+            )
+            part = self.client.get(
+                reverse('media', args=['notes.txt']),
+                HTTP_ACCEPT_ENCODING='br', HTTP_RANGE='bytes=0-99',
+            )
+            b''.join(image.streaming_content)
+            b''.join(part.streaming_content)
+
+        self.assertNotIn('Content-Encoding', image)
+        self.assertEqual(part.status_code, 206)
+        self.assertNotIn('Content-Encoding', part)
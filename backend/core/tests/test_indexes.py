@@ -0,0 +1,137 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.filters import filter_related, MATCH_ALL, MATCH_ANY
+from recipes.pagination import KeysetPagination, keyset_filter
+
+
+USERS = 50
+RECIPES_PER_USER = 500
+PER_USER = 300
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output is Postgres')
+class IndexUsageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'user{i}@gmail.com')
+            for i in range(USERS)
+        )
+        tags, ingredients, recipes = [], [], []
+        for user in users:
+            tags.extend(
+                Tag(user=user, name=f'Tag {i}') for i in range(PER_USER)
+            )
+            ingredients.extend(
+                Ingredient(user=user, name=f'Ingredient {i}')
+                for i in range(PER_USER)
+            )
+            recipes.extend(
+                Recipe(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_minutes=30,
+                    price_dolars=10,
+                )
+                for i in range(RECIPES_PER_USER)
+            )
+        Tag.objects.bulk_create(tags)
+        Ingredient.objects.bulk_create(ingredients)
+        Recipe.objects.bulk_create(recipes)
+
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(
+                recipe_id=recipe.id,
+                tag_id=tags[i // RECIPES_PER_USER * PER_USER + i % PER_USER].id
+            )
+            for i, recipe in enumerate(recipes)
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(
+                recipe_id=recipe.id,
+                ingredient_id=ingredients[
+                    i // RECIPES_PER_USER * PER_USER + i % PER_USER
+                ].id
+            )
+            for i, recipe in enumerate(recipes)
+        )
+
+        with connection.cursor() as cursor:
+            for table in ('core_recipe', 'core_tag', 'core_ingredient',
+                          'core_recipe_tags', 'core_recipe_ingredients'):
+                cursor.execute(f'ANALYZE {table}')
+
+        cls.user = users[0]
+        cls.tag = tags[0]
+        cls.ingredient = ingredients[0]
+
+    def page(self, queryset, ordering, values=None):
+        """Return the query of a page, as `KeysetPagination` builds it
+
+        Whole collections are read by the (user) indexes and sorted, which
+        costs about as much for this few rows per user, pages are what
+        the composite indexes are for.
+        """
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        return queryset[:KeysetPagination.page_size + 1]
+
+    def test_recipes_first_page_uses_index(self):
+        """Test the first page of user's recipes is read from the index"""
+        plan = self.page(
+            Recipe.objects.filter(user=self.user), ('-title', '-id')
+        ).explain()
+
+        self.assertIn('core_recipe_user_title_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_recipes_next_page_uses_index(self):
+        """Test a later page of user's recipes seeks in the index"""
+        recipe = Recipe.objects.filter(user=self.user).order_by('-title')[200]
+        plan = self.page(
+            Recipe.objects.filter(user=self.user), ('-title', '-id'),
+            [recipe.title, recipe.id],
+        ).explain()
+
+        self.assertIn('core_recipe_user_title_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_tags_page_uses_index(self):
+        """Test a page of user's tags is read from the (user, name) index"""
+        plan = self.page(
+            Tag.objects.filter(user=self.user), ('-name', '-id')
+        ).explain()
+
+        self.assertIn('core_tag_user_name_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_filter_recipes_by_tag_uses_index(self):
+        """Test filtering recipes by tag scans the m2m table by tag"""
+        queryset = filter_related(
+            Recipe.objects.filter(user=self.user), Recipe.tags.through,
+            'tag_id', {self.tag.id}, set(), MATCH_ALL
+        )
+        plan = queryset.order_by('-title', '-id').explain()
+
+        self.assertRegex(plan, r'Index (Only )?Scan using core_recipe_tags_')
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_filter_recipes_by_ingredient_uses_index(self):
+        """Test filtering recipes by ingredient scans the m2m by ingredient"""
+        queryset = filter_related(
+            Recipe.objects.filter(user=self.user), Recipe.ingredients.through,
+            'ingredient_id', {self.ingredient.id}, set(), MATCH_ANY
+        )
+        plan = queryset.order_by('-title', '-id').explain()
+
+        self.assertRegex(
+            plan, r'Index (Only )?Scan using core_recipe_ingr'
+        )
+        self.assertNotIn('Seq Scan', plan)
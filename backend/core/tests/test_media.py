@@ -0,0 +1,141 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+HASH = 'ab' * 32
+CONTENT = b'0123456789'
+
+
+def media_url(path):
+    return reverse('media', args=[path])
+
+
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.media_settings = override_settings(
+            MEDIA_ROOT=self.directory.name
+        )
+        self.media_settings.enable()
+
+        self.path = f'uploads/recipes/ab/{HASH}.jpg'
+        os.makedirs(os.path.join(self.directory.name, 'uploads/recipes/ab'))
+        with open(os.path.join(self.directory.name, self.path), 'wb') as f:
+            f.write(CONTENT)
+
+    def tearDown(self):
+        self.media_settings.disable()
+        self.directory.cleanup()
+
+    def test_serve_content_addressed_file(self):
+        res = self.client.get(media_url(self.path))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('ETag', res)
+
+    def test_other_files_revalidated(self):
+        with open(os.path.join(self.directory.name, 'notes.txt'), 'wb') as f:
+            f.write(CONTENT)
+
+        res = self.client.get(media_url('notes.txt'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Cache-Control'], 'public, no-cache')
+
+    def test_if_none_match(self):
+        etag = self.client.get(media_url(self.path))['ETag']
+
+        res = self.client.get(media_url(self.path), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_content_addressed_file_validators_kept_when_touched(self):
+        etag = self.client.get(media_url(self.path))['ETag']
+        # Like the storage does when an upload reuses the file
+        os.utime(
+            os.path.join(self.directory.name, self.path),
+            ns=(0, 10 ** 18),
+        )
+
+        res = self.client.get(media_url(self.path), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertNotIn('Last-Modified', res)
+
+    def test_range(self):
+        res = self.client.get(media_url(self.path), HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), b'2345')
+        self.assertEqual(res['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(res['Content-Length'], '4')
+
+    def test_open_and_suffix_ranges(self):
+        res = self.client.get(media_url(self.path), HTTP_RANGE='bytes=7-')
+        self.assertEqual(b''.join(res.streaming_content), b'789')
+
+        res = self.client.get(media_url(self.path), HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(res.streaming_content), b'789')
+        self.assertEqual(res['Content-Range'], 'bytes 7-9/10')
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(media_url(self.path), HTTP_RANGE='bytes=20-30')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */10')
+
+    def test_stale_if_range_sends_whole_file(self):
+        res = self.client.get(
+            media_url(self.path),
+            HTTP_RANGE='bytes=2-5',
+            HTTP_IF_RANGE='"stale"',
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    def test_missing_file(self):
+        res = self.client.get(media_url('uploads/missing.jpg'))
+        self.assertEqual(res.status_code, 404)
+
+        res = self.client.get(media_url('uploads/recipes'))
+        self.assertEqual(res.status_code, 404)
+
+    def test_path_outside_media_root(self):
+        res = self.client.get(media_url('../../etc/passwd'))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_only_safe_methods(self):
+        res = self.client.post(media_url(self.path))
+
+        self.assertEqual(res.status_code, 405)
+
+    @override_settings(MEDIA_OFFLOAD='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        res = self.client.get(media_url(self.path))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'], f'/protected-media/{self.path}'
+        )
+        self.assertIn('immutable', res['Cache-Control'])
+
+    @override_settings(MEDIA_OFFLOAD='x-sendfile')
+    def test_x_sendfile(self):
+        res = self.client.get(media_url(self.path))
+
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['X-Sendfile'], os.path.join(self.directory.name, self.path)
+        )
@@ -0,0 +1,63 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class UniqueNamesMigrationTests(TransactionTestCase):
+
+    migrate_from = [('core', '0014_content_addressed_images')]
+    migrate_to = [('core', '0015_unique_names')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicate_tags_merged(self):
+        """Test tags differing by case are merged before names are unique"""
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model('core', 'User')
+        Tag = apps.get_model('core', 'Tag')
+        Recipe = apps.get_model('core', 'Recipe')
+        user = User.objects.create(email='test@gmail.com')
+        other_user = User.objects.create(email='other@gmail.com')
+        tag = Tag.objects.create(user=user, name='Vegan')
+        duplicate1 = Tag.objects.create(user=user, name='vegan')
+        duplicate2 = Tag.objects.create(user=user, name='VEGAN')
+        other_tag = Tag.objects.create(user=other_user, name='vegan')
+        recipe1 = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price_dolars=1
+        )
+        recipe1.tags.add(tag, duplicate1)
+        recipe2 = Recipe.objects.create(
+            user=user, title='Stew', time_minutes=5, price_dolars=1
+        )
+        recipe2.tags.add(duplicate2)
+        updated_at = recipe2.updated_at
+
+        apps = self.migrate(self.migrate_to)
+
+        Tag = apps.get_model('core', 'Tag')
+        Recipe = apps.get_model('core', 'Recipe')
+        Tombstone = apps.get_model('core', 'Tombstone')
+        self.assertEqual(
+            set(Tag.objects.values_list('id', flat=True)),
+            {tag.id, other_tag.id}
+        )
+        recipe1 = Recipe.objects.get(id=recipe1.id)
+        recipe2 = Recipe.objects.get(id=recipe2.id)
+        self.assertEqual(
+            list(recipe1.tags.values_list('id', flat=True)), [tag.id]
+        )
+        self.assertEqual(
+            list(recipe2.tags.values_list('id', flat=True)), [tag.id]
+        )
+        self.assertGreater(recipe2.updated_at, updated_at)
+        self.assertEqual(
+            set(Tombstone.objects.values_list('model', 'object_id')),
+            {('tag', duplicate1.id), ('tag', duplicate2.id)}
+        )
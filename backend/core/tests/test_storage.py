@@ -0,0 +1,57 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_file_named_by_content_hash(self):
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save('files/upload.JPG', ContentFile(b'content'))
+
+        self.assertEqual(name, f'files/{digest[:2]}/{digest}.jpg')
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'content')
+
+    def test_name_of_extension_alone(self):
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save('files/.png', ContentFile(b'content'))
+
+        self.assertEqual(name, f'files/{digest[:2]}/{digest}.png')
+
+    def test_same_content_stored_once(self):
+        name1 = self.storage.save('files/a.jpg', ContentFile(b'content'))
+        name2 = self.storage.save('files/b.jpg', ContentFile(b'content'))
+        name3 = self.storage.save('files/c.jpg', ContentFile(b'other'))
+
+        self.assertEqual(name1, name2)
+        self.assertNotEqual(name1, name3)
+        files = [
+            filename
+            for _, _, filenames in os.walk(self.storage.path('files'))
+            for filename in filenames
+        ]
+        self.assertEqual(len(files), 2)
+
+    def test_reused_file_touched(self):
+        """Test saving a stored content again updates its modification time"""
+        name = self.storage.save('files/a.jpg', ContentFile(b'content'))
+        os.utime(self.storage.path(name), (0, 0))
+
+        self.storage.save('files/b.jpg', ContentFile(b'content'))
+
+        self.assertGreater(os.path.getmtime(self.storage.path(name)), 0)
@@ -0,0 +1,149 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+
+# Files stored under the hash of their content, or derived from one, never
+# change and may be cached for good.
+CONTENT_ADDRESSED_RE = re.compile(r'(^|/)[0-9a-f]{64}[./]')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Return the (start, end) bytes asked for by a single range `header`
+
+    None means the whole file should be sent, which is also how requests
+    for several ranges are answered. ValueError is raised for ranges not
+    satisfiable by a file of `size` bytes.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+
+    return start, end
+
+
+def _read_range(f, start, length):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload(path, full_path):
+    response = HttpResponse()
+    if settings.MEDIA_OFFLOAD == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        )
+    else:
+        response['X-Sendfile'] = full_path
+    # The proxy sets the type and length of the file it sends
+    del response['Content-Type']
+
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file with caching headers and range support
+
+    With `MEDIA_OFFLOAD` set, the transfer itself is left to the front
+    proxy and only the headers are produced here.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404('File does not exist')
+    if not os.path.isfile(full_path):
+        raise Http404('File does not exist')
+
+    content_addressed = CONTENT_ADDRESSED_RE.search(path)
+    if content_addressed:
+        cache_control = IMMUTABLE_CACHE_CONTROL
+        # From the name, the file is touched whenever an upload reuses it
+        etag = quote_etag(path[content_addressed.start():].lstrip('/'))
+        last_modified = None
+    else:
+        cache_control = REVALIDATE_CACHE_CONTROL
+        etag = quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+        last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        response['Cache-Control'] = cache_control
+        response['ETag'] = etag
+        return response
+
+    if settings.MEDIA_OFFLOAD:
+        response = _offload(path, full_path)
+    else:
+        content_range = None
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if 'HTTP_RANGE' in request.META and if_range in (None, etag):
+            try:
+                content_range = parse_range(
+                    request.META['HTTP_RANGE'], stat.st_size
+                )
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+
+        content_type, encoding = mimetypes.guess_type(full_path)
+        content_type = content_type or 'application/octet-stream'
+        if content_range is None:
+            response = FileResponse(
+                open(full_path, 'rb'), content_type=content_type
+            )
+        else:
+            start, end = content_range
+            response = StreamingHttpResponse(
+                _read_range(open(full_path, 'rb'), start, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Cache-Control'] = cache_control
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
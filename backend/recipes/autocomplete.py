@@ -0,0 +1,149 @@
+import heapq
+import threading
+
+from django.conf import settings
+
+from core.models import Tag, Ingredient
+from recipes.indexes import UserIndexes
+
+
+def max_typos(text):
+    """Return how many typos are tolerated in a text of that length"""
+    if len(text) < 3:
+        return 0
+    if len(text) < 6:
+        return 1
+    return 2
+
+
+class _Node:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = {}
+
+
+class NameTrie:
+    """Case insensitive trie of names completing typed prefixes
+
+    Names are matched by their prefix edit distance to the typed text, so
+    a few typos in it still find the right name.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.root = _Node()
+        self.names = {}
+
+    @classmethod
+    def build(cls, model, user_id):
+        trie = cls()
+        for id_, name in model.objects.filter(user_id=user_id) \
+                .values_list('id', 'name'):
+            trie.insert(id_, name)
+
+        return trie
+
+    def insert(self, id_, name):
+        with self.lock:
+            self._remove(id_)
+            node = self.root
+            for char in name.casefold():
+                node = node.children.setdefault(char, _Node())
+            node.entries[id_] = name
+            self.names[id_] = name
+
+    def remove(self, id_):
+        with self.lock:
+            self._remove(id_)
+
+    def complete(self, text, limit):
+        """Return `(id, name)` of names best completing `text`
+
+        Names are searched with no typos first and the tolerance is only
+        raised while fewer than `limit` names are found, which keeps the
+        search narrow for the common case.
+        """
+        text = text.casefold()
+        distances = {}
+        with self.lock:
+            for typos in range(max_typos(text) + 1):
+                for id_, name in self._search(text, typos):
+                    distances.setdefault(id_, (typos, name))
+                if len(distances) >= limit:
+                    break
+
+        best_matches = heapq.nsmallest(
+            limit,
+            (
+                (distance, len(name), name.casefold(), id_, name)
+                for id_, (distance, name) in distances.items()
+            ),
+        )
+        return [(id_, name) for *_, id_, name in best_matches]
+
+    def _search(self, text, typos):
+        """Yield names within `typos` prefix edit distance of `text`"""
+        first_row = list(range(len(text) + 1))
+        stack = [(self.root, first_row)]
+        while stack:
+            node, row = stack.pop()
+            if row[-1] <= typos:
+                yield from self._subtree_entries(node)
+                continue
+            if min(row) > typos:
+                continue
+
+            for char, child in node.children.items():
+                left = row[0] + 1
+                child_row = [left]
+                for text_char, diagonal, up in zip(text, row, row[1:]):
+                    left = min(
+                        left + 1, up + 1, diagonal + (text_char != char)
+                    )
+                    child_row.append(left)
+                stack.append((child, child_row))
+
+    def _subtree_entries(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.entries.items()
+            stack.extend(node.children.values())
+
+    def _remove(self, id_):
+        name = self.names.pop(id_, None)
+        if name is None:
+            return
+
+        path = [self.root]
+        for char in name.casefold():
+            path.append(path[-1].children[char])
+        del path[-1].entries[id_]
+
+        for char, parent, node in zip(
+            reversed(name.casefold()), reversed(path[:-1]), reversed(path)
+        ):
+            if node.entries or node.children:
+                break
+            del parent.children[char]
+
+
+tag_indexes = UserIndexes(
+    'tag-autocomplete',
+    lambda user_id: NameTrie.build(Tag, user_id),
+    settings.AUTOCOMPLETE_INDEX_MAX_USERS,
+)
+ingredient_indexes = UserIndexes(
+    'ingredient-autocomplete',
+    lambda user_id: NameTrie.build(Ingredient, user_id),
+    settings.AUTOCOMPLETE_INDEX_MAX_USERS,
+)
+
+
+def indexes_of(model):
+    """Return the autocomplete indexes of tag or ingredient names"""
+    if model is Tag:
+        return tag_indexes
+    return ingredient_indexes
@@ -0,0 +1,272 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from recipes import autocomplete
+from recipes.cache import response_cache
+from recipes.pantry import indexes
+
+
+def invalidate_user_indexes(user_id):
+    """Drop in-memory indexes and cached responses of the user
+
+    Bulk writes don't send the model signals keeping them up to date.
+    """
+    indexes.update(user_id)
+    autocomplete.tag_indexes.update(user_id)
+    autocomplete.ingredient_indexes.update(user_id)
+    response_cache.bump(user_id)
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _not_found():
+    return {'status': status.HTTP_404_NOT_FOUND, 'errors': {
+        'detail': 'Not found.'
+    }}
+
+
+class BulkModelMixin:
+    """Create, update or delete a list of user's objects in one request
+
+    POST creates the objects of the list, PATCH partially updates the ones
+    with the given `id` and DELETE deletes the objects of a list of ids.
+    Items are validated together, related objects with one query per
+    model, and valid ones are written in one transaction with bulk
+    queries. The response has a result for every item, in order, with its
+    own status code.
+    """
+    bulk_max_size = 1000
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False)
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of items.')
+        if len(items) > self.bulk_max_size:
+            raise ValidationError(
+                f'Ensure there are at most {self.bulk_max_size} items.'
+            )
+
+        if request.method == 'POST':
+            results = self.bulk_create(items)
+        elif request.method == 'PATCH':
+            results = self.bulk_update(items)
+        else:
+            results = self.bulk_destroy(items)
+
+        return Response(data=results, status=status.HTTP_200_OK)
+
+    def bulk_create(self, items):
+        context = self.get_bulk_serializer_context(items)
+        serializer_class = self.get_serializer_class()
+        serializers = [
+            serializer_class(data=item, context=context) for item in items
+        ]
+        valid = [
+            serializer for serializer in serializers if serializer.is_valid()
+        ]
+
+        model = self.queryset.model
+        many_to_many = self.get_bulk_many_to_many()
+        with transaction.atomic():
+            self.prepare_bulk_data(
+                [serializer.validated_data for serializer in valid]
+            )
+            objects = model.objects.bulk_create(
+                model(user=self.request.user, **{
+                    name: value
+                    for name, value in serializer.validated_data.items()
+                    if name not in many_to_many
+                })
+                for serializer in valid
+            )
+            self.set_bulk_many_to_many(
+                objects, [serializer.validated_data for serializer in valid]
+            )
+            if objects:
+                self.perform_bulk_write(objects, created=True)
+
+        for serializer, obj in zip(valid, objects):
+            serializer.instance = obj
+        return self.get_bulk_results(
+            serializers, status.HTTP_201_CREATED, context
+        )
+
+    def bulk_update(self, items):
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        instances = self.queryset.filter(user=self.request.user) \
+            .in_bulk([id_ for id_ in ids if _is_id(id_)])
+        context = self.get_bulk_serializer_context(items)
+        serializer_class = self.get_serializer_class()
+
+        serializers = []
+        seen = set()
+        for item in items:
+            id_ = item.get('id') if isinstance(item, dict) else None
+            if id_ in seen:
+                serializers.append({
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'id': ['Duplicate id.']},
+                })
+            elif not _is_id(id_) or id_ not in instances:
+                serializers.append(_not_found())
+            else:
+                serializers.append(serializer_class(
+                    instances[id_], data=item, partial=True, context=context
+                ))
+            if _is_id(id_):
+                seen.add(id_)
+        valid = [
+            serializer for serializer in serializers
+            if not isinstance(serializer, dict) and serializer.is_valid()
+        ]
+
+        many_to_many = self.get_bulk_many_to_many()
+        objects = [serializer.instance for serializer in valid]
+        with transaction.atomic():
+            self.prepare_bulk_data(
+                [serializer.validated_data for serializer in valid]
+            )
+            fields = {'updated_at'}
+            now = timezone.now()
+            for serializer in valid:
+                for name, value in serializer.validated_data.items():
+                    if name not in many_to_many:
+                        setattr(serializer.instance, name, value)
+                        fields.add(name)
+                serializer.instance.updated_at = now
+
+            self.queryset.model.objects.bulk_update(objects, sorted(fields))
+            self.set_bulk_many_to_many(
+                objects,
+                [serializer.validated_data for serializer in valid],
+                replace=True,
+            )
+            if objects:
+                self.perform_bulk_write(objects, created=False)
+
+        return self.get_bulk_results(serializers, status.HTTP_200_OK, context)
+
+    def bulk_destroy(self, ids):
+        queryset = self.queryset.filter(user=self.request.user)
+        found = set(
+            queryset.filter(pk__in=[id_ for id_ in ids if _is_id(id_)])
+            .values_list('id', flat=True)
+        )
+        with transaction.atomic():
+            # Deleted one by one by the collector, which sends the signals
+            queryset.filter(pk__in=found).delete()
+
+        results = []
+        for id_ in ids:
+            if _is_id(id_) and id_ in found:
+                results.append({
+                    'id': id_, 'status': status.HTTP_204_NO_CONTENT
+                })
+            else:
+                results.append(dict(_not_found(), id=id_))
+            if _is_id(id_):
+                found.discard(id_)
+
+        return results
+
+    def get_bulk_many_to_many(self):
+        """Return many-to-many fields of the model set by the serializer"""
+        fields = self.get_serializer_class()().fields
+        return {
+            field.name: field
+            for field in self.queryset.model._meta.many_to_many
+            if field.name in fields and not fields[field.name].read_only
+        }
+
+    def get_bulk_serializer_context(self, items):
+        """Return serializer context with the user's related objects"""
+        context = self.get_serializer_context()
+        context['related_objects'] = {}
+        for name, field in self.get_bulk_many_to_many().items():
+            ids = set()
+            for item in items:
+                values = item.get(name) if isinstance(item, dict) else None
+                if isinstance(values, list):
+                    ids.update(
+                        int(value) for value in values
+                        if _is_id(value) or
+                        isinstance(value, str) and value.isdecimal()
+                    )
+            model = field.related_model
+            context['related_objects'][model] = model.objects \
+                .filter(user=self.request.user) \
+                .in_bulk(ids)
+
+        return context
+
+    def prepare_bulk_data(self, data):
+        """Prepare validated data of the valid items before it's written"""
+
+    def set_bulk_many_to_many(self, objects, data, replace=False):
+        """Insert many-to-many rows of the objects in one query per field
+
+        Related objects are given as instances or ids, repeated ones are
+        inserted once. With `replace`, present rows of the fields given in
+        `data` are deleted first.
+        """
+        for name, field in self.get_bulk_many_to_many().items():
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            pairs = [
+                (obj, values[name])
+                for obj, values in zip(objects, data) if name in values
+            ]
+            if replace:
+                ids = [obj.pk for obj, _ in pairs]
+                through.objects.filter(**{f'{source}__in': ids}).delete()
+            through.objects.bulk_create(
+                through(**{source: obj.pk, target: related_id})
+                for obj, related_objects in pairs
+                for related_id in dict.fromkeys(
+                    getattr(related, 'pk', related)
+                    for related in related_objects
+                )
+            )
+
+    def perform_bulk_write(self, objects, created):
+        invalidate_user_indexes(self.request.user.id)
+
+    def get_bulk_results(self, serializers, status_code, context):
+        """Return results of the items, serializing written objects again
+
+        Written objects are fetched in a single query with their
+        relations, so the response doesn't need a query per item.
+        """
+        written = [
+            serializer.instance for serializer in serializers
+            if not isinstance(serializer, dict) and not serializer.errors
+        ]
+        objects = self.queryset \
+            .prefetch_related(*self.get_bulk_many_to_many()) \
+            .in_bulk([obj.pk for obj in written])
+        serializer_class = self.get_serializer_class()
+
+        results = []
+        for serializer in serializers:
+            if isinstance(serializer, dict):
+                results.append(serializer)
+            elif serializer.errors:
+                results.append({
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                })
+            else:
+                data = serializer_class(
+                    objects[serializer.instance.pk], context=context
+                ).data
+                results.append({'status': status_code, 'data': data})
+
+        return results
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from core.compression import (
+    accepted_encoding, compress_response, is_compressible, set_encoding
+)
+
+
+class ResponseCache:
+    """Cache of rendered responses under a per-user version
+
+    Every key embeds the current version of the user's data, so bumping
+    the version on a change makes all the user's cached responses
+    unreachable at once. Versions are random, an evicted version never
+    brings stale responses back. They're kept in the default cache, shared
+    by all the processes, while the responses are kept in the cache at
+    RESPONSE_CACHE_ALIAS.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[settings.RESPONSE_CACHE_ALIAS]
+
+    def version(self, user_id):
+        key = f'response-version:{user_id}'
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+
+        return version
+
+    def bump(self, user_id):
+        """Bump the version of the user's data now and once committed
+
+        A request may read the new version before the change is committed
+        and cache the data it reads meanwhile, the second bump drops it.
+        """
+        self._bump(user_id)
+        transaction.on_commit(lambda: self._bump(user_id))
+
+    def _bump(self, user_id):
+        cache.set(f'response-version:{user_id}', uuid.uuid4().hex, None)
+
+    def key(self, request):
+        path = hashlib.md5(
+            request.get_full_path().encode('utf-8')
+        ).hexdigest()
+        media_type = request.accepted_media_type
+        encoding = accepted_encoding(request)
+        return f'response:{request.user.id}:' \
+            f'{self.version(request.user.id)}:{media_type}:{encoding}:{path}'
+
+    def get(self, key):
+        cached = self.cache.get(key)
+        with self.lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return cached
+
+    def set(self, key, response):
+        self.cache.set(
+            key,
+            (
+                response['Content-Type'],
+                response.content,
+                response.get('ETag'),
+                response.get('Content-Encoding'),
+            ),
+            settings.RESPONSE_CACHE_TIMEOUT,
+        )
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+response_cache = ResponseCache()
+
+
+class CachedListMixin:
+    """Serve list responses of the user from the response cache
+
+    The ETag of cached responses is kept with them, so conditional
+    requests are answered from the cache too. Responses are cached by the
+    encoding the client accepts, already compressed, so hits aren't
+    compressed again. The browsable API is never cached as its pages embed
+    a CSRF token.
+    """
+
+    def list(self, request, *args, **kwargs):
+        response = self.get_cached_response(request)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return response
+
+    async def async_list(self, request, *args, **kwargs):
+        # The versions and responses are read from the cache over sockets
+        response = await sync_to_async(self.get_cached_response)(request)
+        if response is None:
+            response = await super().async_list(request, *args, **kwargs)
+        return response
+
+    async def async_finalize_response(self, request, response, *args,
+                                      **kwargs):
+        if getattr(self, 'response_cache_key', None) is None:
+            return self.finalize_response(request, response, *args, **kwargs)
+        return await sync_to_async(self.finalize_response)(
+            request, response, *args, **kwargs
+        )
+
+    def get_cached_response(self, request):
+        """Return the cached response, None on a miss or when not cached"""
+        if not settings.RESPONSE_CACHE_ENABLED or \
+                request.accepted_renderer.format == 'api':
+            return None
+
+        key = response_cache.key(request)
+        cached = response_cache.get(key)
+        if cached is None:
+            self.response_cache_key = key
+            return None
+
+        content_type, content, etag, encoding = cached
+        response = HttpResponse(content, content_type=content_type)
+        response['Vary'] = 'Accept'
+        response['X-Cache'] = 'HIT'
+        if encoding is not None:
+            set_encoding(response, encoding)
+        if etag is not None:
+            response['ETag'] = etag
+            response = get_conditional_response(
+                request, etag=etag, response=response
+            )
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        key = getattr(self, 'response_cache_key', None)
+        if key is not None and response.status_code == 200:
+            response.render()
+            encoding = accepted_encoding(request)
+            if encoding is not None and is_compressible(response):
+                compress_response(response, encoding)
+            response_cache.set(key, response)
+            response['X-Cache'] = 'MISS'
+
+        return response
@@ -0,0 +1,134 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core.asyncdb import fetch_values
+from core.models import Ingredient, Tag
+
+
+def make_etag(request, *parts):
+    """Return a strong ETag of `parts` and the representation asked for"""
+    parts = (
+        request.user.id,
+        request.accepted_media_type,
+        request.get_full_path(),
+    ) + parts
+    digest = hashlib.md5(':'.join(map(str, parts)).encode('utf-8'))
+    return quote_etag(digest.hexdigest())
+
+
+def _last_update(model, **filters):
+    """Return a subquery of the last `updated_at` of the matching objects"""
+    return Subquery(
+        model.objects.filter(**filters)
+        .order_by('-updated_at')
+        .values('updated_at')[:1]
+    )
+
+
+class ConditionalRecipeMixin:
+    """Answer conditional list and retrieve requests of recipes
+
+    ETags are computed from `updated_at` of the recipes and of the tags and
+    ingredients, whose names are nested in expanded representations but
+    don't update the recipes. A request with a matching `If-None-Match`
+    gets 304 without any serialization.
+    """
+
+    def list(self, request, *args, **kwargs):
+        etag = make_etag(request, *self.list_version(
+            list(self.list_version_queryset(request))
+        ))
+        return self._conditional_response(
+            request, etag, super().list, *args, **kwargs
+        )
+
+    async def async_list(self, request, *args, **kwargs):
+        etag = make_etag(request, *self.list_version(
+            await fetch_values(self.list_version_queryset(request))
+        ))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await super().async_list(request, *args, **kwargs)
+        return self._set_etag(response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.retrieve_version_queryset(request, kwargs)
+        row = queryset.first() if queryset is not None else None
+        if row is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = make_etag(request, *row.values())
+        return self._conditional_response(
+            request, etag, super().retrieve, *args, **kwargs
+        )
+
+    async def async_retrieve(self, request, *args, **kwargs):
+        queryset = self.retrieve_version_queryset(request, kwargs)
+        rows = await fetch_values(queryset[:1]) if queryset is not None \
+            else []
+        if not rows:
+            # Not found, answered by the synchronous view
+            return None
+
+        etag = make_etag(request, *rows[0].values())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await super().async_retrieve(
+                request, *args, **kwargs
+            )
+        return self._set_etag(response, etag)
+
+    def list_version_queryset(self, request):
+        """Return values of the number and last update of user's recipes"""
+        return self.queryset.filter(user=request.user).order_by() \
+            .values('user') \
+            .annotate(
+                count=Count('id'),
+                updated_at=Max('updated_at'),
+                tags_updated_at=_last_update(Tag, user=OuterRef('user')),
+                ingredients_updated_at=_last_update(
+                    Ingredient, user=OuterRef('user')
+                ),
+            ) \
+            .values(
+                'count',
+                'updated_at',
+                'tags_updated_at',
+                'ingredients_updated_at',
+            )
+
+    def list_version(self, rows):
+        if not rows:
+            return 0, None
+        return tuple(rows[0].values())
+
+    def retrieve_version_queryset(self, request, kwargs):
+        """Return values of the last updates of the recipe, None if invalid"""
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return self.queryset \
+                .filter(user=request.user, pk=kwargs[lookup]) \
+                .values(
+                    'updated_at',
+                    tags_updated_at=_last_update(Tag, recipe=OuterRef('pk')),
+                    ingredients_updated_at=_last_update(
+                        Ingredient, recipe=OuterRef('pk')
+                    ),
+                )
+        except ValueError:
+            return None
+
+    def _conditional_response(self, request, etag, view, *args, **kwargs):
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        return self._set_etag(response, etag)
+
+    def _set_etag(self, response, etag):
+        if response is not None and response.status_code in (200, 304):
+            response['ETag'] = etag
+
+        return response
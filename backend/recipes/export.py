@@ -0,0 +1,19 @@
+from itertools import islice
+
+from recipes.renderers import render_lines
+
+
+def export_lines(rows, serializer, chunk_size):
+    """Yield JSON lines of `rows` of a values() queryset, chunk by chunk
+
+    Rows are read through a server-side cursor with their related objects
+    aggregated by the same query, and represented by the values
+    `serializer`, so only one chunk is held in memory at a time.
+    """
+    rows = rows.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        yield b''.join(render_lines(serializer.to_representation(chunk)))
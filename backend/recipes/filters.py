@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, Exists, F, FloatField, OuterRef
+from django.db.models.functions import Cast
+
+from rest_framework.exceptions import ValidationError
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def parse_ids(qp, name):
+    """Split comma separated ids into included and excluded (`-id`) ids"""
+    included, excluded = set(), set()
+    for str_id in qp.split(','):
+        try:
+            id_ = int(str_id)
+        except ValueError:
+            raise ValidationError({name: f'"{str_id}" is not a valid id.'})
+
+        if str_id.strip().startswith('-'):
+            excluded.add(-id_)
+        else:
+            included.add(id_)
+
+    return included, excluded
+
+
+def parse_match(qp):
+    """Return the match mode, recipes match any of the ids by default"""
+    if qp is None:
+        return MATCH_ANY
+    if qp not in MATCH_MODES:
+        raise ValidationError(
+            {'match': f'Expected one of: {", ".join(MATCH_MODES)}.'}
+        )
+
+    return qp
+
+
+def parse_names(qp, name, allowed):
+    """Split comma separated names, each one of `allowed`"""
+    names = [part.strip() for part in qp.split(',') if part.strip()]
+    for value in names:
+        if value not in allowed:
+            raise ValidationError(
+                {name: f'"{value}" is not one of: {", ".join(allowed)}.'}
+            )
+
+    return names
+
+
+def parse_bounded_int(qp, name, default, max_value):
+    """Parse a non negative integer no greater than `max_value`"""
+    if qp is None:
+        return default
+    try:
+        value = int(qp)
+    except ValueError:
+        value = -1
+    if not 0 <= value <= max_value:
+        raise ValidationError(
+            {name: f'Expected an integer between 0 and {max_value}.'}
+        )
+
+    return value
+
+
+def filter_related(queryset, through, field, included, excluded, match):
+    """Filter recipes by their m2m relation without joining the m2m table
+
+    Every condition is a subquery on the `through` table, so a recipe is
+    never returned twice however many of the ids it matches.
+    """
+    if included and match == MATCH_ALL:
+        matching = through.objects.filter(**{f'{field}__in': included}) \
+            .values('recipe_id') \
+            .annotate(matched=Count(field)) \
+            .filter(matched=len(included)) \
+            .values('recipe_id')
+        queryset = queryset.filter(pk__in=matching)
+    elif included:
+        queryset = queryset.filter(Exists(through.objects.filter(
+            recipe_id=OuterRef('pk'), **{f'{field}__in': included}
+        )))
+
+    if excluded:
+        queryset = queryset.filter(~Exists(through.objects.filter(
+            recipe_id=OuterRef('pk'), **{f'{field}__in': excluded}
+        )))
+
+    return queryset
+
+
+def search(queryset, text):
+    """Filter recipes matching `text` and annotate them with their `rank`
+
+    The rank is cast to double precision so it survives the round trip
+    through a pagination cursor unchanged.
+    """
+    query = SearchQuery(text, config=settings.RECIPE_SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
@@ -0,0 +1,241 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from PIL import Image
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from core.models import Recipe
+
+
+IMAGES_DIRECTORY = 'uploads/recipes/'
+VARIANTS_DIRECTORY = os.path.join(IMAGES_DIRECTORY, 'variants/')
+
+VARIANT_FORMATS = (
+    ('webp', 'WEBP'),
+    ('jpeg', 'JPEG'),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variants_directory(name):
+    stem, _ = os.path.splitext(os.path.basename(name))
+    return os.path.join(VARIANTS_DIRECTORY, stem)
+
+
+def variant_name(name, width, extension):
+    return os.path.join(variants_directory(name), f'{width}.{extension}')
+
+
+def generate_variants(media_root, name, widths, quality):
+    """Write downscaled variants of an image and return their names
+
+    Runs in the worker processes, so it must not touch the database.
+    """
+    variants = {}
+    with Image.open(os.path.join(media_root, name)) as image:
+        image = image.convert('RGB')
+        os.makedirs(
+            os.path.join(media_root, variants_directory(name)), exist_ok=True
+        )
+        for width in widths:
+            width = min(width, image.width)
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+
+            variants[str(width)] = {}
+            for extension, image_format in VARIANT_FORMATS:
+                variant = variant_name(name, width, extension)
+                resized.save(
+                    os.path.join(media_root, variant),
+                    format=image_format,
+                    quality=quality,
+                )
+                variants[str(width)][extension] = variant
+
+    return variants
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS
+            )
+
+    return _executor
+
+
+def _forget_executor(executor):
+    """Drop a broken pool, a worker was killed, so a new one is started"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+def _submit(function, *args):
+    """Return the pool running `function` and its future"""
+    executor = _get_executor()
+    try:
+        return executor, executor.submit(function, *args)
+    except BrokenProcessPool:
+        _forget_executor(executor)
+        executor = _get_executor()
+        return executor, executor.submit(function, *args)
+
+
+def save_variants(recipe_id, name, variants):
+    """Store the variants unless the recipe image was replaced meanwhile
+
+    Variants of an image nothing refers to anymore are deleted.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id, image=name).first()
+    if recipe is None:
+        collect_image(name)
+        return
+
+    if variants is None:
+        recipe.image_status = Recipe.IMAGE_FAILED
+        recipe.image_variants = {}
+    else:
+        recipe.image_status = Recipe.IMAGE_READY
+        recipe.image_variants = variants
+    recipe.save(update_fields=['image_status', 'image_variants', 'updated_at'])
+
+
+def _variants_generated(recipe_id, name, executor, future):
+    try:
+        variants = future.result()
+    except BrokenProcessPool:
+        _forget_executor(executor)
+        variants = None
+    except Exception:
+        variants = None
+
+    try:
+        save_variants(recipe_id, name, variants)
+    finally:
+        connection.close()
+
+
+def process_image(recipe):
+    """Generate variants of the recipe image in the worker processes
+
+    Images are stored once per content, so variants already made for
+    another recipe with the same image are reused. With
+    `IMAGE_PROCESSING_WORKERS` set to 0 they're generated right away in
+    the current process instead.
+    """
+    shared_variants = Recipe.objects \
+        .filter(image=recipe.image.name, image_status=Recipe.IMAGE_READY) \
+        .exclude(pk=recipe.pk) \
+        .values_list('image_variants', flat=True) \
+        .first()
+    if shared_variants is not None:
+        save_variants(recipe.pk, recipe.image.name, shared_variants)
+        return
+
+    args = (
+        _storage().location,
+        recipe.image.name,
+        settings.IMAGE_VARIANT_WIDTHS,
+        settings.IMAGE_VARIANT_QUALITY,
+    )
+    if settings.IMAGE_PROCESSING_WORKERS == 0:
+        try:
+            variants = generate_variants(*args)
+        except Exception:
+            variants = None
+        save_variants(recipe.pk, recipe.image.name, variants)
+        return
+
+    def submit():
+        executor, future = _submit(generate_variants, *args)
+        future.add_done_callback(partial(
+            _variants_generated, recipe.pk, recipe.image.name, executor
+        ))
+
+    transaction.on_commit(submit)
+
+
+def _storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def collect_image(name):
+    """Delete an image and its variants once no recipe refers to it
+
+    Images saved in the last IMAGE_COLLECT_GRACE seconds are kept, as an
+    upload not committed yet may reuse them, and left to
+    `collect_orphaned_images`. The image is moved aside before its age is
+    checked, so an upload reusing it meanwhile stores it again instead.
+    """
+    if not name or Recipe.objects.filter(image=name).exists():
+        return
+
+    storage = _storage()
+    path = storage.path(name)
+    collected_path = f'{path}.{uuid.uuid4().hex}.collected'
+    try:
+        os.rename(path, collected_path)
+    except FileNotFoundError:
+        return
+    if os.path.getmtime(collected_path) >= \
+            time.time() - settings.IMAGE_COLLECT_GRACE:
+        os.replace(collected_path, path)
+        return
+
+    os.remove(collected_path)
+    shutil.rmtree(storage.path(variants_directory(name)), ignore_errors=True)
+
+
+def collect_orphaned_images(grace):
+    """Delete the stored images and variants no recipe refers to
+
+    Only files older than `grace` seconds are deleted, so uploads that
+    aren't committed yet are kept. Returns the number of deleted images.
+    """
+    storage = _storage()
+    names = Recipe.objects \
+        .exclude(image='') \
+        .exclude(image=None) \
+        .values_list('image', flat=True) \
+        .distinct()
+    referenced = set(names.iterator())
+    stems = {
+        os.path.splitext(os.path.basename(name))[0] for name in referenced
+    }
+    deadline = time.time() - grace
+
+    deleted = 0
+    images_path = storage.path(IMAGES_DIRECTORY)
+    variants_path = storage.path(VARIANTS_DIRECTORY)
+    for directory, subdirectories, files in os.walk(images_path):
+        if directory == variants_path.rstrip(os.sep):
+            for stem in subdirectories:
+                path = os.path.join(directory, stem)
+                if stem not in stems and os.path.getmtime(path) < deadline:
+                    shutil.rmtree(path, ignore_errors=True)
+            subdirectories.clear()
+            continue
+
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location) \
+                .replace(os.sep, '/')
+            if name not in referenced and os.path.getmtime(path) < deadline:
+                os.remove(path)
+                deleted += 1
+
+    return deleted
@@ -0,0 +1,113 @@
+import random
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+class UserIndexes:
+    """Bounded LRU of per-user in-memory indexes
+
+    Indexes are built with `build(user_id)` on first use and updated in
+    place by the signals of this process once the change is committed.
+    Every change also increments the user's version in the default cache,
+    which all the processes share, so the others rebuild their copy on
+    next use. An index is rebuilt whenever the version is missing or
+    differs from the one it was built at.
+    """
+
+    def __init__(self, name, build, max_users):
+        self.name = name
+        self.build = build
+        self.max_users = max_users
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        # Users changed by the transaction of the thread, not committed yet
+        self.local = threading.local()
+
+    def get(self, user_id):
+        pending = self._pending()
+        if user_id in pending:
+            if connection.in_atomic_block:
+                # Built with the changes of the transaction, not kept as
+                # it may roll back
+                return self.build(user_id)
+            pending.discard(user_id)
+
+        version = cache.get(self._version_key(user_id))
+        if version is None:
+            # Random, so a version evicted from the cache isn't reused
+            cache.add(
+                self._version_key(user_id), random.getrandbits(48), None
+            )
+            version = cache.get(self._version_key(user_id))
+
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(user_id)
+                return entry[1]
+
+        index = self.build(user_id)
+        with self.lock:
+            self.entries[user_id] = [version, index]
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_users:
+                self.entries.popitem(last=False)
+
+        return index
+
+    def update(self, user_id, change=None):
+        """Apply `change(index)` to the local index and bump the version
+
+        Without `change` the local index is dropped and rebuilt on next use.
+        Inside a transaction both happen once it commits, nothing is
+        applied if it rolls back. Until then `get` builds the index of the
+        user afresh in the transaction, and other threads use the local one.
+        """
+        if connection.in_atomic_block:
+            self._pending().add(user_id)
+        transaction.on_commit(lambda: self._committed(user_id, change))
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _version_key(self, user_id):
+        return f'{self.name}:{user_id}'
+
+    def _pending(self):
+        if not hasattr(self.local, 'pending'):
+            self.local.pending = set()
+        return self.local.pending
+
+    def _committed(self, user_id, change):
+        self._pending().discard(user_id)
+        self._update(user_id, change)
+
+    def _update(self, user_id, change):
+        with self.lock:
+            entry = self.entries.get(user_id)
+        try:
+            version = cache.incr(self._version_key(user_id))
+        except ValueError:
+            cache.add(
+                self._version_key(user_id), random.getrandbits(48), None
+            )
+            version = None
+
+        if entry is None:
+            return
+        # The increment is atomic, the local index is up to date only if
+        # no other process changed the version since it was built
+        if change is None or version is None or entry[0] != version - 1:
+            self.invalidate(user_id)
+            return
+
+        change(entry[1])
+        entry[0] = version
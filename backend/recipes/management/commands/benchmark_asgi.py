@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from app.wsgi import application as wsgi_application
+from core.asyncdb import get_pool
+from core.handlers import AsyncViewsASGIHandler
+from core.models import AuthToken, Recipe
+from recipes.management.commands.benchmark_serializers import create_recipes
+
+
+def wsgi_get(environ):
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(status_line)
+
+    response = wsgi_application(dict(environ), start_response)
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    assert status[0].startswith('200'), status[0]
+
+
+def run_wsgi(url, headers, requests, concurrency):
+    """Serve the requests by threads, like a threaded WSGI server"""
+    environ = RequestFactory().get(url, **{
+        f'HTTP_{name.upper().replace("-", "_")}': value
+        for name, value in headers.items()
+    }).environ
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+
+    def serve():
+        try:
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                wsgi_get(environ)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=serve) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+async def asgi_get(handler, scope):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    await handler(scope, receive, send)
+    assert messages[0]['status'] == 200, messages
+
+
+def run_asgi(handler, url, headers, requests, concurrency):
+    """Serve the requests concurrently by an event loop, in a new thread"""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode('ascii'),
+        'headers': [
+            (name.lower().encode('ascii'), value.encode('latin1'))
+            for name, value in headers.items()
+        ],
+        'server': ('localhost', 80),
+    }
+
+    async def serve():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                await asgi_get(handler, scope)
+
+        try:
+            await asyncio.gather(*(request() for _ in range(requests)))
+        finally:
+            get_pool().close()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(), ))
+    thread.start()
+    thread.join()
+
+
+class Command(BaseCommand):
+    """Command that compares throughput of read endpoints, WSGI and ASGI
+
+    Concurrent requests are served by the WSGI application in threads, by
+    Django's ASGI handler, which runs every view in a thread, and by the
+    project's handler, which serves async actions in the event loop.
+    Database connections are persistent, so no path connects per request,
+    and the response cache is off. The data is committed, for the threads
+    and the asynchronous connections to see it, and deleted at the end.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        email = f'benchmark-{uuid.uuid4().hex}@example.com'
+        settings_dict = connections.databases['default']
+        conn_max_age = settings_dict['CONN_MAX_AGE']
+        settings_dict['CONN_MAX_AGE'] = None
+        try:
+            user = get_user_model().objects.create_user(email=email)
+            create_recipes(user, options['rows'], 3)
+            _, key = AuthToken.objects.create_token(user)
+            recipe = Recipe.objects.filter(user=user).first()
+            connection.close()
+            headers = {'Host': 'localhost', 'Authorization': f'Token {key}'}
+
+            urls = (
+                reverse('recipes:recipe-list') +
+                f'?page_size={options["page_size"]}',
+                reverse('recipes:recipe-detail', args=[recipe.id]),
+                reverse('recipes:tag-list'),
+                reverse('users:me'),
+            )
+            paths = (
+                ('WSGI', lambda url, requests: run_wsgi(
+                    url, headers, requests, options['concurrency']
+                )),
+                ('ASGI, Django handler', lambda url, requests: run_asgi(
+                    ASGIHandler(), url, headers, requests,
+                    options['concurrency']
+                )),
+                ('ASGI, async views', lambda url, requests: run_asgi(
+                    AsyncViewsASGIHandler(), url, headers, requests,
+                    options['concurrency']
+                )),
+            )
+            with override_settings(RESPONSE_CACHE_ENABLED=False):
+                for url in urls:
+                    self.stdout.write(url)
+                    for name, run in paths:
+                        # Warm up connections and the token cache
+                        run(url, options['concurrency'])
+                        start = time.perf_counter()
+                        run(url, options['requests'])
+                        elapsed = time.perf_counter() - start
+                        self.stdout.write(
+                            f'  {name}: '
+                            f'{options["requests"] / elapsed:.0f} requests/s'
+                        )
+        finally:
+            settings_dict['CONN_MAX_AGE'] = conn_max_age
+            get_user_model().objects.filter(email=email).delete()
@@ -0,0 +1,60 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe
+from recipes.management.commands.benchmark_serializers import (
+    best_time, create_recipes, serialize_values
+)
+from recipes.renderers import FastJSONRenderer, MessagePackRenderer
+from recipes.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Command that compares renderers of the recipe list
+
+    Recipes of a temporary user are created in a transaction, which is
+    rolled back at the end, so the database is left untouched.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument(
+            '--related', type=int, default=3,
+            help='Number of tags and of ingredients of every recipe',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email=f'benchmark-{uuid.uuid4().hex}@example.com'
+            )
+            create_recipes(user, options['rows'], options['related'])
+            request = RequestFactory().get('/')
+            request.user = user
+            data = serialize_values(
+                RecipeSerializer,
+                {'request': request},
+                Recipe.objects.filter(user=user).order_by('-title', '-id'),
+            )
+            transaction.set_rollback(True)
+
+        baseline = None
+        for renderer in (
+            JSONRenderer(), FastJSONRenderer(), MessagePackRenderer()
+        ):
+            content = renderer.render(data)
+            render_time = best_time(
+                lambda: renderer.render(data), options['repeat']
+            )
+            baseline = baseline or render_time
+            self.stdout.write(
+                f'{type(renderer).__name__} of {options["rows"]} recipes: '
+                f'{render_time * 1000:.1f} ms '
+                f'({baseline / render_time:.1f}x), {len(content)} bytes'
+            )
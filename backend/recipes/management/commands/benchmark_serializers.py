@@ -0,0 +1,108 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from core.models import Ingredient, Recipe, Tag
+from recipes.serializers import RecipeDetailSerializer, RecipeSerializer
+from recipes.values import ValuesSerializer
+
+
+def _pick(objects, i, count):
+    start = i % (len(objects) - count)
+    return objects[start:start + count]
+
+
+def create_recipes(user, rows, related):
+    """Create `rows` recipes of `user` with `related` tags and ingredients"""
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(related * 4)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'Ingredient {i}')
+        for i in range(related * 4)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            user=user, title=f'Recipe {i}', time_minutes=i % 120,
+            price_dolars=f'{i % 50}.99',
+        )
+        for i in range(rows)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for i, recipe in enumerate(recipes)
+        for tag in _pick(tags, i, related)
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(
+            recipe_id=recipe.id, ingredient_id=ingredient.id
+        )
+        for i, recipe in enumerate(recipes)
+        for ingredient in _pick(ingredients, i, related)
+    )
+
+
+def serialize_values(serializer_class, context, queryset):
+    serializer = ValuesSerializer(serializer_class, context)
+    return serializer.to_representation(serializer.values(queryset))
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+class Command(BaseCommand):
+    """Command that compares serializers of recipe lists
+
+    Recipes of a temporary user are created in a transaction, which is
+    rolled back at the end, so the database is left untouched.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument(
+            '--related', type=int, default=3,
+            help='Number of tags and of ingredients of every recipe',
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email=f'benchmark-{uuid.uuid4().hex}@example.com'
+            )
+            create_recipes(user, options['rows'], options['related'])
+            request = RequestFactory().get('/')
+            request.user = user
+            context = {'request': request}
+            queryset = Recipe.objects.filter(user=user).order_by('id')
+
+            for serializer_class in (RecipeSerializer, RecipeDetailSerializer):
+                model_time = best_time(lambda: serializer_class(
+                    queryset.prefetch_related('tags', 'ingredients'),
+                    many=True,
+                    context=context,
+                ).data, options['repeat'])
+                values_time = best_time(
+                    lambda: serialize_values(
+                        serializer_class, context, queryset
+                    ),
+                    options['repeat']
+                )
+                self.stdout.write(
+                    f'{serializer_class.__name__} of {options["rows"]} '
+                    f'recipes: model {model_time * 1000:.0f} ms, values '
+                    f'{values_time * 1000:.0f} ms, '
+                    f'{model_time / values_time:.1f}x faster'
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes import images
+
+
+class Command(BaseCommand):
+    """Command that deletes recipe images no recipe refers to"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.IMAGE_COLLECT_GRACE,
+            help='Keep files modified in the last GRACE seconds',
+        )
+
+    def handle(self, *args, **options):
+        deleted = images.collect_orphaned_images(options['grace'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} images'))
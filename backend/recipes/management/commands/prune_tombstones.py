@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes import sync
+
+
+class Command(BaseCommand):
+    """Command that deletes tombstones older than the sync retention"""
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones'))
@@ -0,0 +1,78 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Upper
+
+from recipes import autocomplete
+from recipes.cache import response_cache
+
+
+def upper_names(names):
+    """Return the names with their upper case as folded by the database
+
+    Postgres' upper() and Python's str.upper() differ for some characters,
+    'ß' stays as it is in the former, and names are unique by the former.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT name, upper(name) FROM unnest(%s::text[]) AS name',
+            [names]
+        )
+        return dict(cursor.fetchall())
+
+
+def _get_or_create(model, user, keys):
+    missing = {}
+    for name, key in keys.items():
+        missing.setdefault(key, name)
+
+    ids = dict(
+        model.objects
+        .filter(user=user)
+        .annotate(upper_name=Upper('name'))
+        .filter(upper_name__in=missing)
+        .values_list('upper_name', 'id')
+    )
+    for key in ids:
+        missing.pop(key)
+    if not missing:
+        return ids, []
+
+    with transaction.atomic():
+        created = model.objects.bulk_create(
+            model(user=user, name=name) for name in missing.values()
+        )
+    ids.update((keys[obj.name], obj.id) for obj in created)
+    return ids, created
+
+
+def get_or_create_names(model, user, names):
+    """Return ids of user's tags or ingredients by name
+
+    `model` is `Tag` or `Ingredient`. Names are matched regardless of case,
+    like they're unique, and the missing ones are created, so it takes a
+    query for the existing objects and one inserting the rest. Returns the
+    ids and the number of created objects.
+    """
+    keys = upper_names(names)
+    if not keys:
+        return {}, 0
+
+    try:
+        ids, created = _get_or_create(model, user, keys)
+    except IntegrityError:
+        # Lost a race with a request creating some of the names, which
+        # are found the second time
+        ids, created = _get_or_create(model, user, keys)
+
+    if created:
+        # Bulk inserts don't send the signals keeping these up to date
+        def insert_names(trie):
+            for obj in created:
+                trie.insert(obj.id, obj.name)
+        autocomplete.indexes_of(model).update(user.id, insert_names)
+        response_cache.bump(user.id)
+
+    return {name: ids[key] for name, key in keys.items()}, len(created)
@@ -0,0 +1,188 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from core.asyncdb import fetch_values
+
+
+def _field_name(ordering_field):
+    return ordering_field.lstrip('-')
+
+
+def _reverse_ordering(ordering):
+    return tuple(
+        _field_name(field) if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+def _output_field(queryset, name):
+    """Return the model field or annotation the queryset is ordered by"""
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    return queryset.model._meta.get_field(name)
+
+
+def keyset_filter(ordering, values):
+    """Return a filter selecting rows placed after `values` in `ordering`
+
+    For ordering ('-title', '-id') it builds
+    `title < v0 OR (title = v0 AND id < v1)`.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        seek = Q(**{f'{_field_name(field)}__{lookup}': values[i]})
+        for previous_field, value in zip(ordering[:i], values[:i]):
+            seek &= Q(**{_field_name(previous_field): value})
+        condition |= seek
+
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """Keyset pagination over the ordering returned by `view.get_ordering()`
+
+    The last field of the view's ordering has to be unique (`id`), so
+    every page is fetched with a seek condition instead of an OFFSET and
+    page N costs as much as the first one. Pagination is applied only when
+    the request has the `cursor` or `page_size` query param, clients which
+    don't send them still receive the whole collection. Pages are lists of
+    objects or, for a `values()` queryset with the ordering columns, of
+    dicts.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.get_page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        return self.get_page(list(page))
+
+    async def async_paginate_queryset(self, queryset, request, view=None):
+        """Paginate a values() queryset, read without blocking"""
+        page = self.get_page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        return self.get_page(await fetch_values(page))
+
+    def get_page_queryset(self, queryset, request, view):
+        """Return the queryset of the requested page and one more object"""
+        if (self.cursor_query_param not in request.query_params and
+                self.page_size_query_param not in request.query_params):
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(view.get_ordering())
+        self.page_size = self.get_page_size(request)
+
+        self.values, self.reverse = self.decode_cursor(request)
+        ordering = _reverse_ordering(self.ordering) if self.reverse else \
+            self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if self.values is not None:
+            # Cursors come from the client, their values are validated like
+            # the ordering fields' input
+            try:
+                values = [
+                    _output_field(queryset, _field_name(field))
+                    .to_python(value)
+                    for field, value in zip(ordering, self.values)
+                ]
+                queryset = queryset.filter(keyset_filter(ordering, values))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, results):
+        """Return the page of fetched results and set its links"""
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.next_values = None
+        self.previous_values = None
+        if results and (has_more or self.reverse):
+            self.next_values = self._ordering_values(results[-1])
+        if results and (
+            has_more if self.reverse else self.values is not None
+        ):
+            self.previous_values = self._ordering_values(results[0])
+
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        return self.encode_cursor(self.next_values, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_values is None:
+            return None
+        return self.encode_cursor(self.previous_values, reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            values, reverse = cursor['v'], bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+    def encode_cursor(self, values, reverse):
+        cursor = {'v': values, 'r': int(reverse)}
+        encoded = urlsafe_b64encode(json.dumps(cursor).encode('utf-8'))
+        url = replace_query_param(
+            self.base_url, self.cursor_query_param, encoded.decode('ascii')
+        )
+        return replace_query_param(
+            url, self.page_size_query_param, self.page_size
+        )
+
+    def _ordering_values(self, obj):
+        if isinstance(obj, dict):
+            return [obj[_field_name(field)] for field in self.ordering]
+        return [
+            getattr(obj, _field_name(field)) for field in self.ordering
+        ]
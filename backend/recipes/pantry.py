@@ -0,0 +1,100 @@
+import heapq
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from core.models import Recipe
+from recipes.indexes import UserIndexes
+
+
+class PantryIndex:
+    """Inverted index of user's recipes by their ingredients
+
+    Keeps recipe -> ingredients and ingredient -> recipes maps, so ranking
+    recipes against a pantry only touches recipes sharing an ingredient
+    with it, plus the recipes small enough to be missing everything.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recipes = {}
+        self.by_ingredient = defaultdict(set)
+        self.by_size = defaultdict(set)
+
+    @classmethod
+    def build(cls, user_id):
+        index = cls()
+        for recipe_id in Recipe.objects.filter(user_id=user_id) \
+                .values_list('id', flat=True):
+            index.recipes[recipe_id] = set()
+        rows = Recipe.ingredients.through.objects \
+            .filter(recipe__user_id=user_id) \
+            .values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            index.recipes.setdefault(recipe_id, set()).add(ingredient_id)
+            index.by_ingredient[ingredient_id].add(recipe_id)
+        for recipe_id, ingredient_ids in index.recipes.items():
+            index.by_size[len(ingredient_ids)].add(recipe_id)
+
+        return index
+
+    def set_recipe(self, recipe_id, ingredient_ids):
+        with self.lock:
+            self._discard(recipe_id)
+            ingredient_ids = set(ingredient_ids)
+            self.recipes[recipe_id] = ingredient_ids
+            self.by_size[len(ingredient_ids)].add(recipe_id)
+            for ingredient_id in ingredient_ids:
+                self.by_ingredient[ingredient_id].add(recipe_id)
+
+    def remove_recipe(self, recipe_id):
+        with self.lock:
+            self._discard(recipe_id)
+
+    def remove_ingredient(self, ingredient_id):
+        for recipe_id in list(self.by_ingredient.get(ingredient_id, ())):
+            ingredient_ids = self.recipes[recipe_id] - {ingredient_id}
+            self.set_recipe(recipe_id, ingredient_ids)
+
+    def ingredients_of(self, recipe_id):
+        return set(self.recipes.get(recipe_id, ()))
+
+    def match(self, pantry, max_missing, limit):
+        """Return `(recipe_id, missing ingredient ids)` best matches first"""
+        pantry = set(pantry)
+        with self.lock:
+            covered = Counter()
+            for ingredient_id in pantry:
+                covered.update(self.by_ingredient.get(ingredient_id, ()))
+            candidates = set(covered)
+            for size in range(max_missing + 1):
+                candidates.update(self.by_size.get(size, ()))
+
+            ranked = []
+            for recipe_id in candidates:
+                missing = len(self.recipes[recipe_id]) - covered[recipe_id]
+                if missing <= max_missing:
+                    ranked.append((missing, recipe_id))
+
+            return [
+                (recipe_id, self.recipes[recipe_id] - pantry)
+                for _, recipe_id in heapq.nsmallest(limit, ranked)
+            ]
+
+    def _discard(self, recipe_id):
+        ingredient_ids = self.recipes.pop(recipe_id, None)
+        if ingredient_ids is None:
+            return
+
+        self.by_size[len(ingredient_ids)].discard(recipe_id)
+        for ingredient_id in ingredient_ids:
+            recipes = self.by_ingredient[ingredient_id]
+            recipes.discard(recipe_id)
+            if not recipes:
+                del self.by_ingredient[ingredient_id]
+
+
+indexes = UserIndexes(
+    'pantry-index', PantryIndex.build, settings.PANTRY_INDEX_MAX_USERS
+)
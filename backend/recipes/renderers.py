@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer encoding with orjson
+
+    The output is the same as the one of `JSONRenderer`: types orjson
+    doesn't encode the same way, like `Decimal` or datetimes, are left to
+    the encoder of the REST framework. Indented JSON, ASCII only JSON and
+    data orjson can't encode at all are rendered by `JSONRenderer`.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.ensure_ascii or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        # Like JSONRenderer, output JSON that is a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+                .replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer of MessagePack
+
+    Values without a MessagePack type are converted like JSON renders
+    them, except `Decimal`, which becomes a string keeping all its digits
+    instead of a float.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = JSONRenderer.encoder_class
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(
+            data, default=self.default, use_bin_type=True
+        )
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return self.encoder_class().default(obj)
+
+
+class JSONLinesRenderer(BaseRenderer):
+    """Renderer of a list as JSON values separated by new lines"""
+    media_type = 'application/jsonl'
+    format = 'jsonl'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(render_lines(data))
+
+
+class NDJSONRenderer(JSONLinesRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+def render_lines(items):
+    renderer = FastJSONRenderer()
+    for item in items:
+        yield renderer.render(item) + b'\n'
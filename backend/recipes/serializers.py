@@ -1,9 +1,48 @@
+from collections import OrderedDict
+
+from django.core.files.storage import default_storage
+from django.db import models, transaction
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from core.models import Tag, Ingredient, Recipe
+from recipes.names import get_or_create_names, upper_names
+
+
+class UniqueNameSerializer(serializers.ModelSerializer):
+    """Serializer of objects whose names are unique per user, ignoring case
+
+    Bulk requests put the ids of user's objects with the names of the
+    batch in the `existing_names` context, by name upper cased by the
+    database in `name_keys`, so names aren't looked up item by item. Names
+    of the validated items are added to it, so a batch can't repeat a name
+    either.
+    """
 
+    def validate_name(self, name):
+        own_id = self.instance.pk if self.instance is not None else None
+        existing_names = self.context.get('existing_names')
+        if existing_names is not None:
+            key = self.context['name_keys'].get(name) or \
+                upper_names([name])[name]
+            exists = key in existing_names and \
+                (own_id is None or existing_names[key] != own_id)
+            existing_names.setdefault(key, own_id)
+        else:
+            exists = self.Meta.model.objects \
+                .filter(user=self.context['request'].user, name__iexact=name) \
+                .exclude(pk=own_id) \
+                .exists()
+        if exists:
+            raise serializers.ValidationError(
+                f'{self.Meta.model._meta.verbose_name.capitalize()} '
+                f'with this name already exists.'
+            )
 
-class TagSerializer(serializers.ModelSerializer):
+        return name
+
+
+class TagSerializer(UniqueNameSerializer):
     """Serializer for the tag object"""
 
     class Meta:
@@ -12,7 +51,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UniqueNameSerializer):
     """Serializer for the ingredient objects"""
 
     class Meta:
@@ -21,15 +60,158 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', )
 
 
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field of user's objects, looked up in batches
+
+    A list of ids is looked up with one query. Bulk requests put the user's
+    objects referred to by any of their items in the `related_objects`
+    context, by model, so a batch is validated with one query per model
+    instead of one per id.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+        return queryset
+
+    def get_related_objects(self):
+        """Return objects fetched for the batch by id, if there are any"""
+        related_objects = self.context.get('related_objects')
+        if related_objects is None:
+            return None
+        return related_objects[self.queryset.model]
+
+    def to_internal_value(self, data):
+        objects = self.get_related_objects()
+        if objects is None:
+            return super().to_internal_value(data)
+        return self.lookup(data, objects)
+
+    def to_pk(self, data):
+        # Only integers and their strings, int() would truncate floats
+        if isinstance(data, int) and not isinstance(data, bool):
+            return data
+        if isinstance(data, str) and data.isdecimal():
+            return int(data)
+        self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def lookup(self, data, objects):
+        try:
+            return objects[self.to_pk(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+def _by_id(objects):
+    return sorted(objects, key=lambda obj: obj.pk)
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """List of primary keys whose objects are fetched with one query
+
+    Represented in the order of the ids, however the objects were fetched.
+    """
+
+    def to_representation(self, iterable):
+        return super().to_representation(_by_id(iterable))
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        objects = child.get_related_objects()
+        if objects is None:
+            pks = set()
+            for item in data:
+                try:
+                    pks.add(child.to_pk(item))
+                except serializers.ValidationError:
+                    pass
+            objects = child.get_queryset().in_bulk(pks) if pks else {}
+
+        return [child.lookup(item, objects) for item in data]
+
+
+class RelatedObjectsSerializer(serializers.ListSerializer):
+    """Nested objects of a many-to-many, in the order of their ids"""
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        return super().to_representation(_by_id(data))
+
+
+class NamesField(serializers.ListField):
+    """Write only list of tag or ingredient names"""
+    child = serializers.CharField(max_length=255)
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('write_only', True)
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Field mapping widths and formats of image variants to their urls"""
+
+    def to_representation(self, variants):
+        request = self.context.get('request')
+        representation = {}
+        for width, names in variants.items():
+            representation[width] = {}
+            for extension, name in names.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                representation[width][extension] = url
+
+        return representation
+
+
 class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer for the recipe objects"""
-    tags = serializers.PrimaryKeyRelatedField(
+    """Serializer for the recipe objects
+
+    Tags and ingredients are given by ids, by names or both. Names are
+    matched regardless of case to the user's tags and ingredients, and the
+    missing ones are created.
+    """
+    tags = BatchedPrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        required=False,
     )
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = BatchedPrimaryKeyRelatedField(
         many=True,
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        required=False,
+    )
+    tag_names = NamesField()
+    ingredient_names = NamesField()
+    image_variants = ImageVariantsField()
+
+    # related fields the `expand` context nests, with their serializers
+    expandable_fields = {
+        'tags': TagSerializer,
+        'ingredients': IngredientSerializer,
+    }
+
+    # related field, field with names of its objects, related model
+    named_fields = (
+        ('tags', 'tag_names', Tag),
+        ('ingredients', 'ingredient_names', Ingredient),
     )
 
     class Meta:
@@ -41,19 +223,101 @@ class RecipeSerializer(serializers.ModelSerializer):
             'price_dolars',
             'ingredients',
             'tags',
+            'tag_names',
+            'ingredient_names',
+            'image_status',
+            'image_variants',
         )
-        read_only_fields = ('id', )
+        read_only_fields = ('id', 'image_status', )
+
+    def get_fields(self):
+        """Return fields limited to the `fields` of the context, if given
+
+        Related fields in the `expand` context are nested objects.
+        """
+        fields = super().get_fields()
+        for name in self.context.get('expand', ()):
+            fields[name] = RelatedObjectsSerializer(
+                child=self.expandable_fields[name](read_only=True),
+                read_only=True,
+            )
+        selected = self.context.get('fields')
+        if selected is not None:
+            fields = OrderedDict(
+                (name, field) for name, field in fields.items()
+                if name in selected
+            )
+
+        return fields
+
+    def validate(self, attrs):
+        if not self.partial:
+            errors = {
+                field: [self.fields[field].error_messages['required']]
+                for field, names_field, _ in self.named_fields
+                if field not in attrs and names_field not in attrs
+            }
+            if errors:
+                raise serializers.ValidationError(errors)
+
+        return attrs
+
+    @classmethod
+    def resolve_names(cls, data, user):
+        """Replace names in validated data of recipes with ids
+
+        Names of all the recipes are resolved together, creating the missing
+        tags and ingredients, with two queries per model at most. Ids of
+        the named objects are added to the given ones.
+        """
+        for field, names_field, model in cls.named_fields:
+            names = [
+                name for values in data for name in values.get(names_field, ())
+            ]
+            ids, _ = get_or_create_names(model, user, names)
+            for values in data:
+                if names_field in values:
+                    values[field] = list(dict.fromkeys(
+                        [obj.pk for obj in values.get(field, ())] +
+                        [ids[name] for name in values.pop(names_field)]
+                    ))
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self.resolve_names([validated_data], validated_data['user'])
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self.resolve_names([validated_data], instance.user)
+            return super().update(instance, validated_data)
 
 
 class RecipeDetailSerializer(RecipeSerializer):
 
-    ingredients = IngredientSerializer(many=True, read_only=True)
-    tags = TagSerializer(many=True, read_only=True)
+    ingredients = RelatedObjectsSerializer(
+        child=IngredientSerializer(read_only=True), read_only=True
+    )
+    tags = RelatedObjectsSerializer(
+        child=TagSerializer(read_only=True), read_only=True
+    )
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    """Serializer for the recipes matching a pantry"""
+    missing_ingredients = serializers.SerializerMethodField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('missing_ingredients', )
+        read_only_fields = fields
+
+    def get_missing_ingredients(self, recipe):
+        return sorted(self.context['missing_ingredients'][recipe.id])
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image', )
-        read_only_fields = ('id', )
+        fields = ('id', 'image', 'image_status', )
+        read_only_fields = ('id', 'image_status', )
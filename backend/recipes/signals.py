@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag, Tombstone
+from recipes import autocomplete, images
+from recipes.cache import response_cache
+from recipes.pantry import indexes
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_pantry_index(sender, instance, created, **kwargs):
+    if created:
+        indexes.update(
+            instance.user_id, lambda index: index.set_recipe(instance.pk, ())
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_pantry_index(sender, instance, **kwargs):
+    indexes.update(
+        instance.user_id, lambda index: index.remove_recipe(instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def remove_ingredient_from_pantry_index(sender, instance, **kwargs):
+    indexes.update(
+        instance.user_id,
+        lambda index: index.remove_ingredient(instance.pk)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_pantry_index(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        indexes.update(instance.user_id)
+        return
+
+    def change(index):
+        ingredient_ids = index.ingredients_of(instance.pk)
+        if action == 'post_add':
+            ingredient_ids |= pk_set
+        elif action == 'post_remove':
+            ingredient_ids -= pk_set
+        else:
+            ingredient_ids = set()
+        index.set_recipe(instance.pk, ingredient_ids)
+
+    indexes.update(instance.user_id, change)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+def _linked_recipes_changed(recipes):
+    recipes.update_search_vector(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_recipes(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _linked_recipes_changed(Recipe.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        _linked_recipes_changed(
+            Recipe.objects.filter(pk__in=instance._cleared_recipe_ids)
+        )
+    elif action in ('post_add', 'post_remove'):
+        _linked_recipes_changed(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_renamed_recipes(sender, instance, created, **kwargs):
+    # Recipes hold ids of their tags and ingredients, a rename only
+    # changes what they're found by, not when they were last updated
+    if not created:
+        Recipe.objects.filter(pk__in=instance.recipe_set.values('id')) \
+            .update_search_vector()
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_deleted_recipes(sender, instance, **kwargs):
+    instance._deleted_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_deleted_recipes(sender, instance, **kwargs):
+    _linked_recipes_changed(
+        Recipe.objects.filter(pk__in=instance._deleted_recipe_ids)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def add_name_to_autocomplete_index(sender, instance, **kwargs):
+    autocomplete.indexes_of(sender).update(
+        instance.user_id,
+        lambda trie: trie.insert(instance.pk, instance.name)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def remove_name_from_autocomplete_index(sender, instance, **kwargs):
+    autocomplete.indexes_of(sender).update(
+        instance.user_id, lambda trie: trie.remove(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_responses(sender, instance, action=None, **kwargs):
+    if action is None or action.startswith('post_'):
+        response_cache.bump(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_user_tombstones(sender, instance, **kwargs):
+    Tombstone.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(pre_save, sender=Recipe)
+def collect_replaced_image(sender, instance, update_fields, **kwargs):
+    if instance.pk is None or \
+            update_fields is not None and 'image' not in update_fields:
+        return
+
+    instance._replaced_image = Recipe.objects \
+        .filter(pk=instance.pk) \
+        .values_list('image', flat=True) \
+        .first()
+
+
+@receiver(post_save, sender=Recipe)
+def remove_replaced_image(sender, instance, **kwargs):
+    name = getattr(instance, '_replaced_image', None)
+    instance._replaced_image = None
+    if name and name != instance.image.name:
+        transaction.on_commit(lambda: images.collect_image(name))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_deleted_image(sender, instance, **kwargs):
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: images.collect_image(name))
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import Tag, Ingredient, Recipe, Tombstone
+
+
+SYNC_TOKEN_SALT = 'recipes.sync'
+
+
+class ResyncRequired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Sync token expired, a full resync is required.'
+    default_code = 'resync_required'
+
+
+def make_token(synced_at):
+    """Return an opaque token of changes made up to `synced_at`"""
+    since = synced_at - timedelta(seconds=settings.SYNC_TOKEN_OVERLAP)
+    return signing.dumps({'since': since.isoformat()}, salt=SYNC_TOKEN_SALT)
+
+
+def parse_token(token):
+    """Return the time the changes should be sent since
+
+    Tokens older than the tombstones kept can't be answered with the
+    deletions since, the client has to sync everything again.
+    """
+    try:
+        since = parse_datetime(
+            signing.loads(token, salt=SYNC_TOKEN_SALT)['since']
+        )
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        since = None
+    if since is None:
+        raise ValidationError({'token': 'Invalid sync token.'})
+    if since < retained_since():
+        raise ResyncRequired()
+
+    return since
+
+
+def retained_since():
+    """Return the time since which tombstones are kept"""
+    return timezone.now() - timedelta(
+        seconds=settings.SYNC_TOMBSTONE_RETENTION
+    )
+
+
+def prune_tombstones():
+    """Delete tombstones older than the retention, returns their number"""
+    deleted, _ = Tombstone.objects \
+        .filter(deleted_at__lt=retained_since()) \
+        .delete()
+    return deleted
+
+
+def changes(user, since):
+    """Return querysets of user's records changed since `since`
+
+    Without `since` every record is returned and there are no deletions.
+    """
+    recipes = Recipe.objects.filter(user=user) \
+        .prefetch_related('tags', 'ingredients')
+    tags = Tag.objects.filter(user=user)
+    ingredients = Ingredient.objects.filter(user=user)
+    tombstones = Tombstone.objects.none()
+    if since is not None:
+        recipes = recipes.filter(updated_at__gt=since)
+        tags = tags.filter(updated_at__gt=since)
+        ingredients = ingredients.filter(updated_at__gt=since)
+        tombstones = Tombstone.objects.filter(
+            user=user, deleted_at__gt=since
+        )
+
+    return (
+        recipes.order_by('id'),
+        tags.order_by('id'),
+        ingredients.order_by('id'),
+        tombstones.values_list('model', 'object_id'),
+    )
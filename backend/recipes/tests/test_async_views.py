@@ -0,0 +1,266 @@
+import asyncio
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import brotli
+import psycopg2
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.asyncdb import AsyncConnectionPool
+from core.handlers import AsyncViewsASGIHandler
+from core.models import AuthToken, Ingredient, Recipe, Tag
+from users.authentication import token_cache
+
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TAGS_URL = reverse('recipes:tag-list')
+ME_URL = reverse('users:me')
+EXPORT_URL = reverse('recipes:recipe-export')
+
+
+def detail_url(recipe_id):
+    return reverse('recipes:recipe-detail', args=[recipe_id])
+
+
+def asgi_get(handler, url, **headers):
+    """Return the status, headers and body of a GET request to `handler`"""
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode('ascii'),
+        'headers': [
+            (name.lower().encode('ascii'), value.encode('latin1'))
+            for name, value in dict(headers, Host='testserver').items()
+        ],
+        'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(handler)(scope, receive, send)
+    start = messages[0]
+    return (
+        start['status'],
+        {name.decode(): value.decode('latin1')
+         for name, value in start['headers']},
+        b''.join(message.get('body', b'') for message in messages[1:]),
+    )
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsyncViewsTests(TransactionTestCase):
+    """Test read endpoints served in the event loop, the data committed"""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.handler = AsyncViewsASGIHandler()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test_password', name='Test'
+        )
+        _, key = AuthToken.objects.create_token(self.user)
+        self.auth = {'Authorization': f'Token {key}'}
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {key}')
+
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=i,
+                price_dolars='2.50',
+            )
+            recipe.tags.add(*tags[:i % 3 + 1])
+            recipe.ingredients.add(ingredient)
+            self.recipes.append(recipe)
+
+        # The first request caches the token, by the synchronous view
+        asgi_get(self.handler, ME_URL, **self.auth)
+
+    def get(self, url, **headers):
+        with patch(
+            'core.handlers.sync_to_async', wraps=sync_to_async
+        ) as thread_hop:
+            res = asgi_get(self.handler, url, **dict(self.auth, **headers))
+        return res, thread_hop.called
+
+    def assertServedAsync(self, url, **headers):
+        (status, response_headers, body), thread_hop = self.get(
+            url, **headers
+        )
+
+        self.assertEqual(status, 200)
+        self.assertFalse(thread_hop)
+        self.assertEqual(body, self.client.get(url).content)
+        return response_headers, body
+
+    def test_list_recipes(self):
+        self.assertServedAsync(RECIPES_URL)
+
+    def test_list_recipes_filtered_and_paginated(self):
+        tag = Tag.objects.get(name='Tag 2')
+        self.assertServedAsync(f'{RECIPES_URL}?tags={tag.id}&page_size=1')
+        self.assertServedAsync(f'{RECIPES_URL}?fields=id,title&page_size=2')
+
+        cursor = self.client.get(f'{RECIPES_URL}?page_size=2').json()['next']
+        self.assertServedAsync(cursor.replace('http://testserver', ''))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_list_recipes_from_response_cache(self):
+        self.get(RECIPES_URL)
+
+        (status, headers, _), thread_hop = self.get(RECIPES_URL)
+
+        self.assertEqual(headers['X-Cache'], 'HIT')
+        self.assertFalse(thread_hop)
+
+    def test_retrieve_recipe(self):
+        url = detail_url(self.recipes[0].id)
+
+        headers, _ = self.assertServedAsync(url)
+
+        self.assertEqual(headers['ETag'], self.client.get(url)['ETag'])
+        (status, _, body), thread_hop = self.get(
+            url, **{'If-None-Match': headers['ETag']}
+        )
+        self.assertEqual(status, 304)
+        self.assertFalse(thread_hop)
+
+    def test_list_tags(self):
+        self.assertServedAsync(TAGS_URL)
+
+    def test_retrieve_user(self):
+        self.assertServedAsync(ME_URL)
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_caches_read_outside_of_event_loop(self):
+        """Test the shared caches aren't read or written by the event loop"""
+        in_event_loop = []
+
+        def outside_of_event_loop(method):
+            def wrapper(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    in_event_loop.append(method.__name__)
+                except RuntimeError:
+                    pass
+                return method(*args, **kwargs)
+            return wrapper
+
+        with ExitStack() as stack:
+            for backend in (cache, caches[settings.RESPONSE_CACHE_ALIAS]):
+                for name in ('get', 'add', 'set'):
+                    stack.enter_context(patch.object(
+                        backend, name,
+                        outside_of_event_loop(getattr(backend, name)),
+                    ))
+            for _ in range(2):
+                (status, headers, _), thread_hop = self.get(RECIPES_URL)
+                self.assertEqual(status, 200)
+                self.assertFalse(thread_hop)
+            self.assertServedAsync(ME_URL)
+
+        self.assertEqual(headers['X-Cache'], 'HIT')
+        self.assertEqual(in_event_loop, [])
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_compressed_by_middleware(self):
+        (status, headers, body), thread_hop = self.get(
+            RECIPES_URL, **{'Accept-Encoding': 'br'}
+        )
+
+        self.assertFalse(thread_hop)
+        self.assertEqual(headers['Content-Encoding'], 'br')
+        self.assertEqual(
+            brotli.decompress(body), self.client.get(RECIPES_URL).content
+        )
+
+    def test_errors_served_by_sync_view(self):
+        (status, _, _), thread_hop = self.get(detail_url(0))
+        self.assertEqual(status, 404)
+        self.assertTrue(thread_hop)
+
+        (status, _, _), thread_hop = self.get(RECIPES_URL + '?tags=x')
+        self.assertEqual(status, 400)
+
+        status, _, _ = asgi_get(self.handler, RECIPES_URL)
+        self.assertEqual(status, 401)
+
+    def test_database_error_served_by_sync_view(self):
+        with patch(
+            'core.asyncdb.AsyncConnectionPool.fetch',
+            side_effect=psycopg2.OperationalError,
+        ), self.assertLogs('core.async_views', 'WARNING'):
+            (status, _, body), thread_hop = self.get(RECIPES_URL)
+
+        self.assertEqual(status, 200)
+        self.assertTrue(thread_hop)
+        self.assertEqual(body, self.client.get(RECIPES_URL).content)
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_export_streamed(self):
+        """Test the export's cursor is read outside of the event loop"""
+        status, headers, body = asgi_get(
+            self.handler, f'{EXPORT_URL}?format=jsonl', **self.auth
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            body,
+            b''.join(self.client.get(
+                f'{EXPORT_URL}?format=jsonl'
+            ).streaming_content)
+        )
+        self.assertEqual(len(body.splitlines()), len(self.recipes))
+
+    def test_uncached_token_looked_up_by_sync_view(self):
+        other = get_user_model().objects.create_user(email='other@gmail.com')
+        _, key = AuthToken.objects.create_token(other)
+
+        (status, _, _), thread_hop = self.get(
+            RECIPES_URL, Authorization=f'Token {key}'
+        )
+
+        # Uncached tokens are looked up by the synchronous view
+        self.assertEqual(status, 200)
+        self.assertTrue(thread_hop)
+
+
+class AsyncConnectionPoolTests(TransactionTestCase):
+
+    def test_closed_idle_connection_not_reused(self):
+        """Test connections the server closed while idle are replaced"""
+        def terminate(pid):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+            time.sleep(0.1)
+
+        async def fetch_after_restart():
+            pool = AsyncConnectionPool()
+            try:
+                [(pid, )] = await pool.fetch('SELECT pg_backend_pid()', [])
+                await sync_to_async(terminate)(pid)
+                return await pool.fetch('SELECT 1', [])
+            finally:
+                pool.close()
+
+        self.assertEqual(async_to_sync(fetch_after_restart)(), [(1, )])
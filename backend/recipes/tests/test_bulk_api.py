@@ -0,0 +1,389 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, Tombstone
+
+from recipes import autocomplete
+from recipes.pantry import indexes
+
+
+RECIPES_BULK_URL = reverse('recipes:recipe-bulk')
+TAGS_BULK_URL = reverse('recipes:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipes:ingredient-bulk')
+
+
+def create_user(email='test@gmail.com', password='test_password'):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def recipe_payload(title='Simple recipe', **params):
+    payload = {
+        'title': title,
+        'time_minutes': 10,
+        'price_dolars': '5.00',
+        'tags': [],
+        'ingredients': [],
+    }
+    payload.update(params)
+    return payload
+
+
+class BulkRecipesApiTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Tofu'
+        )
+
+    def test_bulk_create_recipes(self):
+        payload = [
+            recipe_payload(
+                'Tofu curry',
+                tags=[self.tag.id],
+                ingredients=[self.ingredient.id],
+            ),
+            recipe_payload('Salad'),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in res.data], [201, 201]
+        )
+        recipe = Recipe.objects.get(title='Tofu curry')
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+        self.assertEqual(res.data[0]['data']['id'], recipe.id)
+        self.assertEqual(res.data[0]['data']['tags'], [self.tag.id])
+        self.assertEqual(
+            list(Recipe.objects.filter(search_vector='curry')), [recipe]
+        )
+
+    def test_bulk_create_reports_invalid_items(self):
+        """Test invalid items are reported and valid ones still created"""
+        other_tag = Tag.objects.create(
+            user=create_user('o@gmail.com'), name='X'
+        )
+        payload = [
+            recipe_payload('Valid'),
+            recipe_payload('Foreign tag', tags=[other_tag.id]),
+            recipe_payload('', time_minutes='long'),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(
+            [result['status'] for result in res.data], [201, 400, 400]
+        )
+        self.assertIn('tags', res.data[1]['errors'])
+        self.assertIn('title', res.data[2]['errors'])
+        self.assertIn('time_minutes', res.data[2]['errors'])
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Valid']
+        )
+
+    def test_bulk_create_rejects_ids_that_are_not_integers(self):
+        """Test ids given as floats or other strings are not truncated"""
+        payload = [
+            recipe_payload('Float', tags=[self.tag.id + 0.9]),
+            recipe_payload('Decimal string', tags=[f'{self.tag.id}.0']),
+            recipe_payload('Superscript', tags=['²']),
+            recipe_payload('String', tags=[str(self.tag.id)]),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(
+            [result['status'] for result in res.data], [400, 400, 400, 201]
+        )
+        self.assertIn('tags', res.data[0]['errors'])
+        self.assertEqual(res.data[3]['data']['tags'], [self.tag.id])
+
+    def test_bulk_create_with_repeated_ids(self):
+        """Test repeated related ids are linked once, as by one create"""
+        payload = [
+            recipe_payload('Curry', tags=[self.tag.id, self.tag.id]),
+            recipe_payload('Soup', tags=[self.tag.id, str(self.tag.id)]),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(
+            [result['status'] for result in res.data], [201, 201]
+        )
+        for result in res.data:
+            self.assertEqual(result['data']['tags'], [self.tag.id])
+
+    def test_bulk_create_query_count(self):
+        """Test the number of queries doesn't depend on number of items"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(10)
+        ]
+        payload = [
+            recipe_payload(
+                f'Recipe {i}',
+                tags=[tag.id for tag in tags],
+                ingredients=[self.ingredient.id],
+            )
+            for i in range(20)
+        ]
+
+        # Related objects 2, savepoint 2, recipes 1, m2m rows 2,
+        # search vector 1, written recipes 3
+        with self.assertNumQueries(11):
+            res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(len(res.data), 20)
+        self.assertEqual(Recipe.tags.through.objects.count(), 200)
+
+    def test_bulk_create_recipes_with_names(self):
+        """Test names of all the items are resolved together"""
+        payload = [
+            recipe_payload('Tofu curry', tag_names=['vegan', 'Dinner']),
+            recipe_payload(
+                'Stew', tag_names=['dinner'], ingredient_names=['Carrot']
+            ),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(
+            [result['status'] for result in res.data], [201, 201]
+        )
+        dinner = Tag.objects.get(user=self.user, name='Dinner')
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertEqual(
+            set(Recipe.objects.get(title='Tofu curry').tags.all()),
+            {self.tag, dinner}
+        )
+        stew = Recipe.objects.get(title='Stew')
+        self.assertEqual(list(stew.tags.all()), [dinner])
+        self.assertEqual(
+            list(stew.ingredients.values_list('name', flat=True)), ['Carrot']
+        )
+        self.assertEqual(res.data[1]['data']['tags'], [dinner.id])
+        self.assertEqual(
+            autocomplete.tag_indexes.get(self.user.id).complete('Din', 10),
+            [(dinner.id, 'Dinner')]
+        )
+
+    def test_bulk_update_recipes(self):
+        recipe1 = Recipe.objects.create(
+            user=self.user, title='Old', time_minutes=5, price_dolars=1
+        )
+        recipe1.tags.add(self.tag)
+        recipe2 = Recipe.objects.create(
+            user=self.user, title='Other', time_minutes=5, price_dolars=1
+        )
+        other_recipe = Recipe.objects.create(
+            user=create_user('o@gmail.com'),
+            title='Foreign', time_minutes=5, price_dolars=1
+        )
+        payload = [
+            {'id': recipe1.id, 'title': 'Tofu curry', 'tags': []},
+            {'id': recipe2.id, 'ingredients': [self.ingredient.id]},
+            {'id': other_recipe.id, 'title': 'Mine'},
+            {'id': recipe1.id, 'title': 'Again'},
+        ]
+        updated_at = recipe1.updated_at
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(
+            [result['status'] for result in res.data], [200, 200, 404, 400]
+        )
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        other_recipe.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Tofu curry')
+        self.assertEqual(list(recipe1.tags.all()), [])
+        self.assertEqual(recipe2.title, 'Other')
+        self.assertEqual(list(recipe2.ingredients.all()), [self.ingredient])
+        self.assertEqual(other_recipe.title, 'Foreign')
+        self.assertEqual(
+            list(Recipe.objects.filter(search_vector='curry')), [recipe1]
+        )
+        self.assertGreater(recipe1.updated_at, updated_at)
+
+    def test_bulk_update_with_repeated_ids(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price_dolars=1
+        )
+
+        res = self.client.patch(
+            RECIPES_BULK_URL,
+            [{
+                'id': recipe.id,
+                'tags': [self.tag.id, str(self.tag.id)],
+                'ingredients': [self.ingredient.id, self.ingredient.id],
+            }],
+            format='json'
+        )
+
+        self.assertEqual(res.data[0]['status'], 200)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(list(recipe.ingredients.all()), [self.ingredient])
+
+    def test_bulk_update_invalidates_pantry_index(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price_dolars=1
+        )
+        index = indexes.get(self.user.id)
+
+        self.client.patch(
+            RECIPES_BULK_URL,
+            [{'id': recipe.id, 'ingredients': [self.ingredient.id]}],
+            format='json'
+        )
+
+        self.assertIsNot(indexes.get(self.user.id), index)
+        self.assertEqual(
+            indexes.get(self.user.id).ingredients_of(recipe.id),
+            {self.ingredient.id}
+        )
+
+    def test_bulk_delete_recipes(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price_dolars=1
+        )
+        other_recipe = Recipe.objects.create(
+            user=create_user('o@gmail.com'),
+            title='Foreign', time_minutes=5, price_dolars=1
+        )
+
+        res = self.client.delete(
+            RECIPES_BULK_URL, [recipe.id, other_recipe.id], format='json'
+        )
+
+        self.assertEqual(res.data, [
+            {'id': recipe.id, 'status': 204},
+            {'id': other_recipe.id, 'status': 404,
+             'errors': {'detail': 'Not found.'}},
+        ])
+        self.assertFalse(Recipe.objects.filter(pk=recipe.id).exists())
+        self.assertTrue(Recipe.objects.filter(pk=other_recipe.id).exists())
+        self.assertTrue(
+            Tombstone.objects.filter(object_id=recipe.id).exists()
+        )
+
+    def test_bulk_requires_list(self):
+        res = self.client.post(
+            RECIPES_BULK_URL, recipe_payload(), format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_max_size(self):
+        payload = [recipe_payload()] * 1001
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BulkTagsApiTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create_tags(self):
+        names = autocomplete.tag_indexes.get(self.user.id)
+
+        res = self.client.post(
+            TAGS_BULK_URL, [{'name': 'Vegan'}, {'name': ''}], format='json'
+        )
+
+        self.assertEqual([result['status'] for result in res.data], [201, 400])
+        tag = Tag.objects.get(user=self.user)
+        self.assertEqual(res.data[0]['data'], {'id': tag.id, 'name': 'Vegan'})
+        self.assertIsNot(autocomplete.tag_indexes.get(self.user.id), names)
+
+    def test_bulk_create_duplicate_names(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{'name': 'vegan'}, {'name': 'Dessert'}, {'name': 'DESSERT'}],
+            format='json'
+        )
+
+        self.assertEqual(
+            [result['status'] for result in res.data], [400, 201, 400]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_names_folded_by_database(self):
+        """Test names are compared by their upper case in the database"""
+        Tag.objects.create(user=self.user, name='Straße')
+
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{'name': 'straße'}, {'name': 'STRASSE'}],
+            format='json'
+        )
+
+        self.assertEqual([result['status'] for result in res.data], [400, 201])
+        self.assertEqual(
+            set(Tag.objects.values_list('name', flat=True)),
+            {'Straße', 'STRASSE'}
+        )
+
+    def test_bulk_rename_to_taken_name(self):
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [
+                {'id': tag1.id, 'name': 'VEGAN'},
+                {'id': tag2.id, 'name': 'vegan'},
+            ],
+            format='json'
+        )
+
+        self.assertEqual([result['status'] for result in res.data], [200, 400])
+        tag1.refresh_from_db()
+        self.assertEqual(tag1.name, 'VEGAN')
+
+    def test_bulk_rename_ingredients(self):
+        """Test linked recipes are found by the new ingredient names"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price_dolars=1
+        )
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.patch(
+            INGREDIENTS_BULK_URL,
+            [{'id': ingredient.id, 'name': 'Tempeh'}],
+            format='json'
+        )
+
+        self.assertEqual(res.data[0]['status'], 200)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'Tempeh')
+        self.assertEqual(
+            list(Recipe.objects.filter(search_vector='tempeh')), [recipe]
+        )
+
+    def test_bulk_delete_tags(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.delete(TAGS_BULK_URL, [tag.id, 'x'], format='json')
+
+        self.assertEqual([result['status'] for result in res.data], [204, 404])
+        self.assertFalse(Tag.objects.exists())
@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from recipes.indexes import UserIndexes
+
+
+class UserIndexesTests(TransactionTestCase):
+    """Test per-user indexes of processes sharing the default cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.data = {1: {'a'}}
+
+        def build(user_id):
+            return set(self.data[user_id])
+
+        # Two processes, with their own indexes
+        self.indexes = UserIndexes('test-index', build, 10)
+        self.other_indexes = UserIndexes('test-index', build, 10)
+
+    def change(self, indexes, value):
+        """Add `value` to the data and to the index, like signals do"""
+        self.data[1].add(value)
+        indexes.update(1, lambda index: index.add(value))
+
+    def test_updated_in_place(self):
+        """Test a change is applied without rebuilding the index"""
+        index = self.indexes.get(1)
+
+        self.change(self.indexes, 'b')
+
+        self.assertIs(self.indexes.get(1), index)
+        self.assertEqual(index, {'a', 'b'})
+
+    def test_rebuilt_after_change_of_other_process(self):
+        """Test a change made by another process invalidates the index"""
+        self.indexes.get(1)
+        self.other_indexes.get(1)
+
+        self.change(self.other_indexes, 'b')
+
+        self.assertEqual(self.indexes.get(1), {'a', 'b'})
+
+    def test_rebuilt_when_changed_concurrently(self):
+        """Test a change racing one of another process drops the index"""
+        self.indexes.get(1)
+        self.other_indexes.get(1)
+        incr = cache.incr
+        racing = [True]
+
+        def incr_racing_other_process(key, *args, **kwargs):
+            if racing:
+                racing.pop()
+                # The other process changes the data in between
+                self.change(self.other_indexes, 'b')
+            return incr(key, *args, **kwargs)
+
+        with patch.object(cache, 'incr', incr_racing_other_process):
+            self.change(self.indexes, 'c')
+
+        self.assertEqual(self.indexes.get(1), {'a', 'b', 'c'})
+
+    def test_rebuilt_after_commit(self):
+        """Test an index built before a change was committed is rebuilt"""
+        index = self.indexes.get(1)
+
+        with transaction.atomic():
+            self.indexes.update(1, lambda index: index.add('b'))
+            # Built by the other process without the uncommitted change
+            self.other_indexes.get(1)
+            self.data[1].add('b')
+
+        self.assertEqual(self.other_indexes.get(1), {'a', 'b'})
+        self.assertIs(self.indexes.get(1), index)
+        self.assertEqual(index, {'a', 'b'})
+
+    def test_not_applied_on_rollback(self):
+        """Test a change is seen by its transaction only, not kept after"""
+        index = self.indexes.get(1)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.change(self.indexes, 'b')
+                self.assertEqual(self.indexes.get(1), {'a', 'b'})
+                raise RuntimeError
+        self.data[1].discard('b')
+
+        self.assertIs(self.indexes.get(1), index)
+        self.assertEqual(index, {'a'})
+
+    def test_rebuilt_when_version_evicted(self):
+        """Test an index whose version is no longer cached is rebuilt"""
+        index = self.indexes.get(1)
+        cache.clear()
+
+        self.assertIsNot(self.indexes.get(1), index)
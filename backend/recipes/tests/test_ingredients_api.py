@@ -5,10 +5,13 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Ingredient
+from recipes.autocomplete import NameTrie
+from recipes.indexes import UserIndexes
 from recipes.serializers import IngredientSerializer
 
 
 INGREDIENT_URL = reverse("recipes:ingredient-list")
+AUTOCOMPLETE_URL = reverse("recipes:ingredient-autocomplete")
 
 
 def create_user(email, password):
@@ -74,9 +77,95 @@ class PrivateIngredientAPITests(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_get_or_create_ingredient(self):
+        """Test ingredient names are unique, get_or_create reuses them"""
+        ingredient = Ingredient.objects.create(name="Salt", user=self.user)
+
+        res = self.client.post(INGREDIENT_URL, {"name": "salt"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            f'{INGREDIENT_URL}?get_or_create=1', {"name": "salt"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], ingredient.id)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 1
+        )
+
     def test_attemt_to_create_empty_ingredient(self):
         """Test creating a ingredient with empty name is unsuccessful."""
         payload = {"name": ""}
         res = self.client.post(INGREDIENT_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_ingredients(self):
+        """Test completing a prefix lists shortest names first"""
+        salt = Ingredient.objects.create(name="Salt", user=self.user)
+        salmon = Ingredient.objects.create(name="Salmon", user=self.user)
+        Ingredient.objects.create(name="Tomato", user=self.user)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'sal'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, IngredientSerializer([salt, salmon], many=True).data
+        )
+
+    def test_autocomplete_ingredients_with_typos(self):
+        """Test names are completed despite a typo in the typed text"""
+        salmon = Ingredient.objects.create(name="Salmon", user=self.user)
+        Ingredient.objects.create(name="Tomato", user=self.user)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'selm'})
+
+        self.assertEqual(res.data, [IngredientSerializer(salmon).data])
+
+    def test_autocomplete_follows_ingredient_changes(self):
+        """Test created, renamed and deleted ingredients are completed"""
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'pe'})
+
+        pepper = Ingredient.objects.create(name="Pepper", user=self.user)
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'pe'})
+        self.assertEqual(res.data, [IngredientSerializer(pepper).data])
+
+        pepper.name = 'Paprika'
+        pepper.save()
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'pe'})
+        self.assertEqual(res.data, [])
+
+        pepper.delete()
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'pa'})
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_follows_changes_of_other_process(self):
+        """Test names changed by another process are completed"""
+        pepper = Ingredient.objects.create(name="Pepper", user=self.user)
+        self.client.get(AUTOCOMPLETE_URL, {'q': 'pe'})
+        other_process_indexes = UserIndexes(
+            'ingredient-autocomplete',
+            lambda user_id: NameTrie.build(Ingredient, user_id),
+            10,
+        )
+
+        # Written by the other process, whose signals update its indexes
+        Ingredient.objects.filter(id=pepper.id).update(name='Paprika')
+        other_process_indexes.update(
+            self.user.id, lambda trie: trie.insert(pepper.id, 'Paprika')
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'pa'})
+        self.assertEqual(
+            res.data, [{'id': pepper.id, 'name': 'Paprika'}]
+        )
+
+    def test_autocomplete_only_user_ingredients(self):
+        other_user = create_user(
+            email="other@gmail.com", password="other_password"
+        )
+        Ingredient.objects.create(name="Salt", user=other_user)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'sal'})
+
+        self.assertEqual(res.data, [])
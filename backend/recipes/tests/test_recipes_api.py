@@ -1,11 +1,23 @@
+import json
 import os
+import shutil
 import tempfile
+import time
+from base64 import urlsafe_b64encode
+from concurrent.futures.process import BrokenProcessPool
 from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -13,10 +25,13 @@ from rest_framework.test import APIClient
 
 from core.models import Tag, Ingredient, Recipe
 
+from recipes import autocomplete, images
 from recipes.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
 RECIPES_URL = reverse("recipes:recipe-list")
+PANTRY_URL = reverse("recipes:recipe-pantry")
+EXPORT_URL = reverse("recipes:recipe-export")
 
 
 def image_upload_url(recipe_id):
@@ -27,6 +42,26 @@ def detail_recipe_url(recipe_id):
     return reverse('recipes:recipe-detail', args=[recipe_id])
 
 
+def upload_image(client, recipe, size=(16, 16), color='black'):
+    url = image_upload_url(recipe.id)
+    with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+        img = Image.new('RGB', size, color)
+        img.save(ntf, format='JPEG')
+        ntf.seek(0)
+        return client.post(url, {'image': ntf}, format='multipart')
+
+
+def delete_images():
+    names = Recipe.objects.exclude(image='').exclude(image=None) \
+        .values_list('image', flat=True)
+    for name in set(names):
+        default_storage.delete(name)
+        shutil.rmtree(
+            default_storage.path(images.variants_directory(name)),
+            ignore_errors=True
+        )
+
+
 def create_user(email, password):
     return get_user_model().objects.create_user(email=email, password=password)
 
@@ -168,6 +203,127 @@ class PrivateRecipesAPITests(TestCase):
         self.assertIn(ingredient, ingredients)
         self.assertIn(other_ingredient, ingredients)
 
+    def test_create_recipe_with_tag_and_ingredient_names(self):
+        """Test names are matched ignoring case and missing ones created"""
+        tag = sample_tag(user=self.user, name='Vegan')
+        other_tag = sample_tag(user=self.user, name='Quick')
+        sample_tag(user=create_user('o@gmail.com', 'pass'), name='Dinner')
+        payload = {
+            'title': 'Tofu curry',
+            'time_minutes': 30,
+            'price_dolars': '5.00',
+            'tags': [other_tag.id],
+            'tag_names': ['vegan', 'Dinner', 'DINNER'],
+            'ingredient_names': ['Tofu'],
+        }
+        autocomplete.tag_indexes.get(self.user.id)
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        dinner = Tag.objects.get(user=self.user, name='Dinner')
+        self.assertEqual(
+            set(recipe.tags.all()), {tag, other_tag, dinner}
+        )
+        self.assertEqual(
+            list(recipe.ingredients.values_list('name', flat=True)),
+            ['Tofu']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertCountEqual(
+            res.data['tags'], [tag.id, other_tag.id, dinner.id]
+        )
+        self.assertNotIn('tag_names', res.data)
+        self.assertEqual(
+            autocomplete.tag_indexes.get(self.user.id).complete('Dinn', 10),
+            [(dinner.id, 'Dinner')]
+        )
+
+    def test_create_recipe_with_names_folded_by_database(self):
+        """Test names are matched by their upper case in the database"""
+        tag = sample_tag(user=self.user, name='Straße')
+        payload = {
+            'title': 'Bratwurst',
+            'time_minutes': 30,
+            'price_dolars': '5.00',
+            'tag_names': ['straße', 'STRASSE'],
+            'ingredients': [],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Straße', 'STRASSE'}
+        )
+        self.assertIn(tag, recipe.tags.all())
+
+    def test_create_recipe_names_query_count(self):
+        """Test the number of queries doesn't depend on number of names"""
+        def create(count):
+            payload = {
+                'title': f'Recipe {count}',
+                'time_minutes': 30,
+                'price_dolars': '5.00',
+                'tag_names': [f'Tag {count} {i}' for i in range(count)],
+                'ingredient_names': [
+                    f'Ingredient {count} {i}' for i in range(count)
+                ],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(create(2), create(20))
+
+    def test_create_recipe_with_other_user_tag(self):
+        tag = sample_tag(user=create_user('o@gmail.com', 'pass'))
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 30,
+            'price_dolars': '5.00',
+            'tags': [tag.id],
+            'ingredients': [],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_requires_tags_or_names(self):
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 30,
+            'price_dolars': '5.00',
+            'tag_names': [],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'ingredients'})
+
+    def test_partial_update_recipe_with_tag_names(self):
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.patch(
+            detail_recipe_url(recipe.id),
+            {'tag_names': ['Dessert']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(recipe.tags.values_list('name', flat=True)), ['Dessert']
+        )
+
     def test_partial_update_recipe(self):
         recipe = sample_recipe(user=self.user)
         recipe.tags.add(sample_tag(user=self.user))
@@ -258,7 +414,598 @@ class PrivateRecipesAPITests(TestCase):
         self.assertNotIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
 
+    def test_filter_recipes_by_many_tags_without_duplicates(self):
+        """Test recipes having several of the tags are listed once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Tag 1')
+        tag2 = sample_tag(user=self.user, name='Tag 2')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(res.data, [RecipeSerializer(recipe).data])
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test only recipes having every tag are listed with match=all"""
+        tag1 = sample_tag(user=self.user, name='Tag 1')
+        tag2 = sample_tag(user=self.user, name='Tag 2')
+        recipe1 = sample_recipe(user=self.user, title='Recipe 1')
+        recipe1.tags.add(tag1, tag2)
+        recipe2 = sample_recipe(user=self.user, title='Recipe 2')
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id},{tag2.id}', 'match': 'all'}
+        )
+
+        self.assertEqual(res.data, [RecipeSerializer(recipe1).data])
+
+    def test_filter_recipes_excluding_ingredients(self):
+        """Test recipes having an ingredient with a minus id are excluded"""
+        ingredient1 = sample_ingredient(user=self.user, name='Ingredient 1')
+        ingredient2 = sample_ingredient(user=self.user, name='Ingredient 2')
+        recipe1 = sample_recipe(user=self.user, title='Recipe 1')
+        recipe1.ingredients.add(ingredient1)
+        recipe2 = sample_recipe(user=self.user, title='Recipe 2')
+        recipe2.ingredients.add(ingredient1, ingredient2)
+        recipe3 = sample_recipe(user=self.user, title='Recipe 3')
+
+        res = self.client.get(
+            RECIPES_URL, {'ingredients': f'-{ingredient2.id}'}
+        )
+        self.assertEqual(res.data, RecipeSerializer(
+            [recipe3, recipe1], many=True
+        ).data)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'ingredients': f'{ingredient1.id},-{ingredient2.id}'}
+        )
+        self.assertEqual(res.data, [RecipeSerializer(recipe1).data])
+
+    def test_filter_recipes_invalid_params(self):
+        """Test malformed ids and unknown match modes are rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paginate_recipes(self):
+        """Test walking through recipes pages with cursors"""
+        for title in ['A', 'B', 'B', 'B', 'C']:
+            sample_recipe(user=self.user, title=title)
+        recipes = Recipe.objects.filter(user=self.user) \
+            .order_by('-title', '-id')
+        serializer = RecipeSerializer(recipes, many=True)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data[:2])
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], serializer.data[2:4])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], serializer.data[4:])
+        self.assertIsNone(res.data['next'])
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(res.data['results'], serializer.data[2:4])
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(res.data['results'], serializer.data[:2])
+        self.assertIsNone(res.data['previous'])
+
+    def test_paginate_recipes_invalid_cursor(self):
+        """Test using a malformed cursor returns not found"""
+        res = self.client.get(RECIPES_URL, {'cursor': 'not a cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_paginate_recipes_tampered_cursor(self):
+        """Test cursor values not valid for the ordering return not found"""
+        sample_recipe(user=self.user)
+        for values, params in [
+            (['a', 'b'], {}),
+            (['a', None], {}),
+            (['x', 1], {'search': 'recipe'}),
+        ]:
+            cursor = urlsafe_b64encode(
+                json.dumps({'v': values, 'r': 0}).encode('utf-8')
+            ).decode('ascii')
+
+            res = self.client.get(RECIPES_URL, dict(params, cursor=cursor))
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecipesQueryCountTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+        for i in range(20):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                self.tag, sample_tag(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                self.ingredient,
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+        self.recipe = recipe
+
+    def test_list_recipes_query_count(self):
+        """Test recipes are listed with their relations by one query"""
+        # ETag 1, recipes with their tag and ingredient ids 1
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 20)
+
+    def test_filter_recipes_query_count(self):
+        """Test filtering recipes doesn't query the db per recipe"""
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                RECIPES_URL,
+                {
+                    'tags': f'{self.tag.id}',
+                    'ingredients': f'{self.ingredient.id}',
+                }
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 20)
+
+    def test_detail_recipe_query_count(self):
+        """Test retrieving a recipe uses a constant number of queries"""
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_recipe_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+
+
+class RecipeSparseFieldsetsTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.tag = sample_tag(user=self.user, name='Vegan')
+        self.ingredient = sample_ingredient(user=self.user, name='Tofu')
+        self.recipe = sample_recipe(user=self.user, title='Curry')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+        sample_recipe(user=self.user, title='Salad')
+
+    def test_list_selected_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': recipe.id, 'title': recipe.title}
+            for recipe in Recipe.objects.order_by('-title')
+        ])
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('core_recipe_tags', sql)
+        self.assertNotIn('price_dolars', sql)
+
+    def test_list_expanded_tags(self):
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'title,tags,ingredients', 'expand': 'tags'}
+        )
+
+        self.assertEqual(res.data[1], {
+            'title': 'Curry',
+            'tags': [{'id': self.tag.id, 'name': 'Vegan'}],
+            'ingredients': [self.ingredient.id],
+        })
+
+    def test_paginate_selected_fields(self):
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'time_minutes', 'page_size': 1}
+        )
+        next_res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'], [{'time_minutes': 45}])
+        self.assertEqual(next_res.data['results'], [{'time_minutes': 45}])
+        self.assertIsNone(next_res.data['next'])
+
+    def test_retrieve_selected_fields(self):
+        """Test only the selected columns and relations are loaded"""
+        url = detail_recipe_url(self.recipe.id)
+
+        # ETag 1, recipe 1, tags 1
+        with self.assertNumQueries(3), \
+                CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, {'fields': 'title,tags'})
+
+        self.assertEqual(res.data, {
+            'title': 'Curry', 'tags': [{'id': self.tag.id, 'name': 'Vegan'}]
+        })
+        self.assertNotIn('image_variants', queries.captured_queries[1]['sql'])
+
+    def test_invalid_fields(self):
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+        res = self.client.get(RECIPES_URL, {'fields': 'tag_names'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'expand': 'title'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.data)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class RecipeConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = sample_recipe(user=self.user)
+        self.tag = sample_tag(user=self.user)
+        self.recipe.tags.add(self.tag)
+
+    def assertNotModified(self, url, etag):
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_list_not_modified(self):
+        """Test listing unchanged recipes returns not modified"""
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertNotModified(RECIPES_URL, res['ETag'])
+
+    def test_list_etag_changes_with_recipes(self):
+        """Test any change of user's recipes changes the list ETag"""
+        changes = [
+            lambda: sample_recipe(user=self.user, title='New'),
+            lambda: self.recipe.tags.remove(self.tag),
+            lambda: Recipe.objects.filter(title='New').delete(),
+        ]
+        etag = self.client.get(RECIPES_URL)['ETag']
+        for change in changes:
+            change()
+
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(res['ETag'], etag)
+            etag = res['ETag']
+
+    def test_detail_not_modified(self):
+        url = detail_recipe_url(self.recipe.id)
+        res = self.client.get(url)
+
+        self.assertNotModified(url, res['ETag'])
+
+    def test_detail_etag_changes_with_tag_name(self):
+        """Test renaming a tag changes the ETag of its recipes"""
+        url = detail_recipe_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
 
+        self.tag.name = 'Renamed'
+        self.tag.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Renamed')
+
+    def test_list_etag_changes_with_tag_name(self):
+        """Test renaming a tag changes the ETag of expanded lists"""
+        url = f'{RECIPES_URL}?expand=tags'
+        etag = self.client.get(url)['ETag']
+
+        self.tag.name = 'Renamed'
+        self.tag.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'Renamed')
+
+    def test_etag_of_other_user_recipe(self):
+        """Test other users' recipes stay not found"""
+        other_user = create_user(
+            email="other@gmail.com", password="other_password"
+        )
+        recipe = sample_recipe(user=other_user)
+
+        res = self.client.get(detail_recipe_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
+
+
+class RecipeSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_search_recipes_by_title_tags_and_ingredients(self):
+        """Test search matches title, tag and ingredient names"""
+        soup = sample_recipe(user=self.user, title='Tomato Soup')
+        salad = sample_recipe(user=self.user, title='Summer Salad')
+        salad.ingredients.add(sample_ingredient(self.user, name='Tomatoes'))
+        pasta = sample_recipe(user=self.user, title='Pasta')
+        pasta.tags.add(sample_tag(self.user, name='Tomato'))
+        sample_recipe(user=self.user, title='Pancakes')
+
+        results = self.search('tomato')
+
+        self.assertEqual(results[0], RecipeSerializer(soup).data)
+        self.assertCountEqual(
+            [recipe['id'] for recipe in results],
+            [soup.id, salad.id, pasta.id]
+        )
+
+    def test_search_only_user_recipes(self):
+        other_user = create_user(
+            email="other@gmail.com", password="other_password"
+        )
+        sample_recipe(user=other_user, title='Tomato Soup')
+
+        self.assertEqual(self.search('tomato'), [])
+
+    def test_search_follows_renamed_and_deleted_tags(self):
+        """Test search vector is kept up to date with tag changes"""
+        recipe = sample_recipe(user=self.user, title='Pasta')
+        tag = sample_tag(self.user, name='Italian')
+        recipe.tags.add(tag)
+        self.assertEqual(len(self.search('italian')), 1)
+
+        tag.name = 'Vegan'
+        tag.save()
+        self.assertEqual(self.search('italian'), [])
+        self.assertEqual(len(self.search('vegan')), 1)
+
+        tag.delete()
+        self.assertEqual(self.search('vegan'), [])
+
+    def test_paginate_search_results(self):
+        """Test walking through search results pages ordered by rank"""
+        tag = sample_tag(self.user, name='Soup')
+        for i in range(5):
+            recipe = sample_recipe(user=self.user, title=f'Soup {i}')
+            if i % 2:
+                recipe.tags.add(tag)
+        results = self.search('soup')
+
+        page = self.search('soup', page_size=2)
+        paginated = page['results']
+        while page['next']:
+            page = self.client.get(page['next']).data
+            paginated += page['results']
+
+        self.assertEqual(paginated, results)
+
+
+class RecipePantryTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.eggs = sample_ingredient(user=self.user, name='Eggs')
+        self.milk = sample_ingredient(user=self.user, name='Milk')
+        self.flour = sample_ingredient(user=self.user, name='Flour')
+        self.sugar = sample_ingredient(user=self.user, name='Sugar')
+        self.butter = sample_ingredient(user=self.user, name='Butter')
+
+        self.omelette = sample_recipe(user=self.user, title='Omelette')
+        self.omelette.ingredients.add(self.eggs, self.milk)
+        self.pancakes = sample_recipe(user=self.user, title='Pancakes')
+        self.pancakes.ingredients.add(self.eggs, self.milk, self.flour)
+        self.cake = sample_recipe(user=self.user, title='Cake')
+        self.cake.ingredients.add(
+            self.eggs, self.flour, self.sugar, self.butter
+        )
+
+    def test_pantry_ranks_recipes_by_coverage(self):
+        """Test fully covered recipes are listed before partial ones"""
+        res = self.client.get(
+            PANTRY_URL, {'ingredients': f'{self.eggs.id},{self.milk.id}'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(recipe['id'], recipe['missing_ingredients'])
+             for recipe in res.data],
+            [(self.omelette.id, []), (self.pancakes.id, [self.flour.id])]
+        )
+
+    def test_pantry_max_missing(self):
+        """Test recipes missing more ingredients are listed on request"""
+        res = self.client.get(PANTRY_URL, {
+            'ingredients': f'{self.eggs.id},{self.milk.id}',
+            'max_missing': 3,
+        })
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data],
+            [self.omelette.id, self.pancakes.id, self.cake.id]
+        )
+        self.assertEqual(
+            res.data[2]['missing_ingredients'],
+            sorted([self.flour.id, self.sugar.id, self.butter.id])
+        )
+
+    def test_pantry_only_user_recipes(self):
+        """Test other users' recipes are never matched"""
+        other_user = create_user(
+            email="other@gmail.com", password="other_password"
+        )
+        sample_recipe(user=other_user, title='Water')
+
+        res = self.client.get(PANTRY_URL, {'max_missing': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_pantry_invalid_params(self):
+        """Test a malformed max_missing is rejected"""
+        res = self.client.get(PANTRY_URL, {'max_missing': 'all'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pantry_excluded_ingredients_rejected(self):
+        """Test `-id` exclusions are rejected rather than ignored"""
+        res = self.client.get(
+            PANTRY_URL, {'ingredients': f'{self.eggs.id},-{self.milk.id}'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ingredients', res.data)
+
+
+class RecipePantryIndexTests(TransactionTestCase):
+    """Test the pantry index once changes are committed"""
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.eggs = sample_ingredient(user=self.user, name='Eggs')
+        self.milk = sample_ingredient(user=self.user, name='Milk')
+        self.flour = sample_ingredient(user=self.user, name='Flour')
+
+        self.omelette = sample_recipe(user=self.user, title='Omelette')
+        self.omelette.ingredients.add(self.eggs, self.milk)
+        self.pancakes = sample_recipe(user=self.user, title='Pancakes')
+        self.pancakes.ingredients.add(self.eggs, self.milk, self.flour)
+        self.cake = sample_recipe(user=self.user, title='Cake')
+        self.cake.ingredients.add(self.eggs, self.flour)
+
+    def test_pantry_index_updated_incrementally(self):
+        """Test recipe changes are applied without rebuilding the index"""
+        self.client.get(PANTRY_URL, {'ingredients': f'{self.eggs.id}'})
+        self.omelette.ingredients.remove(self.milk)
+        self.cake.delete()
+        self.milk.delete()
+        recipe = sample_recipe(user=self.user, title='Boiled Eggs')
+        recipe.ingredients.add(self.eggs)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                PANTRY_URL, {'ingredients': f'{self.eggs.id}'}
+            )
+
+        self.assertEqual(
+            [(recipe['id'], recipe['missing_ingredients'])
+             for recipe in res.data],
+            [
+                (self.omelette.id, []),
+                (recipe.id, []),
+                (self.pancakes.id, [self.flour.id]),
+            ]
+        )
+
+
+class RecipeExportTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        lines = b''.join(res.streaming_content).decode('utf-8').splitlines()
+        return res, [json.loads(line) for line in lines]
+
+    def test_export_recipes(self):
+        tag = sample_tag(user=self.user, name='Vegan')
+        ingredient = sample_ingredient(user=self.user, name='Tofu')
+        recipe1 = sample_recipe(user=self.user, title='Tofu curry')
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = sample_recipe(user=self.user, title='Salad')
+        other_user = create_user(email="other@gmail.com", password="pass")
+        sample_recipe(user=other_user)
+
+        res, recipes = self.export()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('recipes.ndjson', res['Content-Disposition'])
+        context = {'request': res.wsgi_request}
+        self.assertEqual(recipes, [
+            json.loads(json.dumps(
+                RecipeDetailSerializer(recipe, context=context).data
+            ))
+            for recipe in (recipe1, recipe2)
+        ])
+        self.assertEqual(recipes[0]['tags'], [{'id': tag.id, 'name': 'Vegan'}])
+
+    def test_export_jsonl(self):
+        sample_recipe(user=self.user)
+
+        res, recipes = self.export(format='jsonl')
+
+        self.assertEqual(res['Content-Type'], 'application/jsonl')
+        self.assertEqual(len(recipes), 1)
+
+    def test_export_reads_in_chunks(self):
+        """Test recipes are read by one cursor with their relations"""
+        tag = sample_tag(user=self.user)
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}').tags.add(tag)
+
+        with patch('recipes.views.RecipeViewSet.export_chunk_size', 2), \
+                CaptureQueriesContext(connection) as queries:
+            _, recipes = self.export()
+
+        self.assertEqual(len(recipes), 5)
+        reads = [
+            query for query in queries.captured_queries
+            if 'core_recipe_tags' in query['sql']
+        ]
+        self.assertEqual(len(reads), 1)
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
@@ -271,7 +1018,10 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
-        self.recipe.image.delete()
+        delete_images()
+
+    def upload_image(self, recipe=None, size=(16, 16), color='black'):
+        return upload_image(self.client, recipe or self.recipe, size, color)
 
     def test_upload_image(self):
         url = image_upload_url(self.recipe.id)
@@ -292,3 +1042,202 @@ class RecipeImageUploadTests(TestCase):
             url, {'image': 'not an image'}, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_image_generates_variants(self):
+        with self.settings(IMAGE_VARIANT_WIDTHS=(320, 640)):
+            res = self.upload_image(size=(480, 240))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(set(self.recipe.image_variants), {'320', '480'})
+        for width, names in self.recipe.image_variants.items():
+            self.assertEqual(set(names), {'webp', 'jpeg'})
+            for name in names.values():
+                with Image.open(default_storage.path(name)) as variant:
+                    self.assertEqual(variant.width, int(width))
+
+    def test_image_variants_listed(self):
+        self.upload_image()
+
+        res = self.client.get(detail_recipe_url(self.recipe.id))
+
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(set(res.data['image_variants']), {'16'})
+        url = res.data['image_variants']['16']['webp']
+        self.assertTrue(url.startswith('http://testserver/'))
+        self.assertTrue(url.endswith('/16.webp'))
+
+    def test_unreadable_image_marked_failed(self):
+        with patch('recipes.images.generate_variants', side_effect=OSError):
+            res = self.upload_image()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertEqual(self.recipe.image_variants, {})
+
+    def test_same_image_stored_once(self):
+        recipe = sample_recipe(user=self.user, title='Other')
+        self.upload_image()
+        self.upload_image(recipe=recipe)
+
+        self.recipe.refresh_from_db()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, self.recipe.image.name)
+        self.assertRegex(
+            recipe.image.name,
+            r'^uploads/recipes/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
+        )
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(recipe.image_variants, self.recipe.image_variants)
+
+    def test_different_images_stored_apart(self):
+        recipe = sample_recipe(user=self.user, title='Other')
+        self.upload_image()
+        self.upload_image(recipe=recipe, color='white')
+
+        self.recipe.refresh_from_db()
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image.name, self.recipe.image.name)
+
+    @override_settings(IMAGE_COLLECT_GRACE=0)
+    def test_collect_image_keeps_shared_image(self):
+        recipe = sample_recipe(user=self.user, title='Other')
+        self.upload_image()
+        self.upload_image(recipe=recipe)
+        recipe.refresh_from_db()
+        name = recipe.image.name
+        variant = recipe.image_variants['16']['webp']
+
+        recipe.delete()
+        images.collect_image(name)
+        self.assertTrue(default_storage.exists(name))
+
+        self.recipe.delete()
+        images.collect_image(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant))
+
+    def test_collect_orphaned_images(self):
+        self.upload_image()
+        self.recipe.refresh_from_db()
+        orphan = default_storage.save(
+            'uploads/recipes/orphan.jpg', ContentFile(b'orphan')
+        )
+
+        call_command('collect_images', '--grace=3600', stdout=StringIO())
+        self.assertTrue(default_storage.exists(orphan))
+
+        call_command('collect_images', '--grace=0', stdout=StringIO())
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+        for names in self.recipe.image_variants.values():
+            for name in names.values():
+                self.assertTrue(default_storage.exists(name))
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0, IMAGE_COLLECT_GRACE=0)
+class RecipeImageCollectionTests(TransactionTestCase):
+    """Test images are deleted once the transaction is committed"""
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        delete_images()
+
+    def test_replaced_image_deleted(self):
+        upload_image(self.client, self.recipe)
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+        variant = self.recipe.image_variants['16']['jpeg']
+
+        upload_image(self.client, self.recipe, color='white')
+
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant))
+        self.recipe.refresh_from_db()
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+
+    def test_shared_image_kept_when_replaced(self):
+        recipe = sample_recipe(user=self.user, title='Other')
+        upload_image(self.client, self.recipe)
+        upload_image(self.client, recipe)
+        recipe.refresh_from_db()
+
+        upload_image(self.client, self.recipe, color='white')
+
+        self.assertTrue(default_storage.exists(recipe.image.name))
+
+    def test_deleted_recipe_image_deleted(self):
+        upload_image(self.client, self.recipe)
+        self.recipe.refresh_from_db()
+
+        self.client.delete(detail_recipe_url(self.recipe.id))
+
+        self.assertFalse(default_storage.exists(self.recipe.image.name))
+
+    @override_settings(IMAGE_COLLECT_GRACE=3600)
+    def test_recently_saved_image_kept(self):
+        """Test an image an uncommitted upload may reuse isn't deleted"""
+        upload_image(self.client, self.recipe)
+        self.recipe.refresh_from_db()
+
+        self.client.delete(detail_recipe_url(self.recipe.id))
+
+        name = self.recipe.image.name
+        self.assertTrue(default_storage.exists(name))
+        default_storage.delete(name)
+        shutil.rmtree(
+            default_storage.path(images.variants_directory(name)),
+            ignore_errors=True
+        )
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=1)
+class RecipeImagePoolTests(TransactionTestCase):
+    """Test variants generated by the pool of worker processes"""
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        delete_images()
+        executor = images._get_executor()
+        executor.shutdown()
+        images._forget_executor(executor)
+
+    def wait_for_variants(self):
+        for _ in range(100):
+            self.recipe.refresh_from_db()
+            if self.recipe.image_status != Recipe.IMAGE_PROCESSING:
+                return
+            time.sleep(0.1)
+
+    def test_broken_pool_replaced(self):
+        """Test a pool whose worker was killed is replaced"""
+        executor = images._get_executor()
+        with self.assertRaises(BrokenProcessPool):
+            executor.submit(os._exit, 1).result()
+
+        res = upload_image(self.client, self.recipe)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PROCESSING)
+        self.wait_for_variants()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertIsNot(images._get_executor(), executor)
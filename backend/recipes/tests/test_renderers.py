@@ -0,0 +1,152 @@
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+import msgpack
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipes.parsers import FastJSONParser, MessagePackParser
+from recipes.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+DATA = OrderedDict([
+    ('id', 1),
+    ('price', Decimal('12.50')),
+    ('created', datetime.datetime(
+        2020, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc
+    )),
+    ('day', datetime.date(2020, 3, 1)),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('label', gettext_lazy('Recipe')),
+    ('text', 'Crème brûlée '),
+    ('ids', (1, 2)),
+    ('counts', {1: 2}),
+    ('nested', [OrderedDict([('a', None), ('b', 1.5), ('c', True)])]),
+])
+
+
+class RendererTests(SimpleTestCase):
+
+    def test_fast_json_same_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+
+    def test_fast_json_indented(self):
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type),
+        )
+
+    def test_fast_json_falls_back_on_big_integers(self):
+        data = {'id': 2 ** 70}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_message_pack_keeps_decimal_digits(self):
+        data = msgpack.unpackb(
+            MessagePackRenderer().render(DATA),
+            raw=False, strict_map_key=False,
+        )
+
+        self.assertEqual(data['price'], '12.50')
+        self.assertEqual(data['created'], '2020-03-01T12:30:15.123456Z')
+        self.assertEqual(data['ids'], [1, 2])
+        self.assertEqual(data['counts'], {1: 2})
+
+    def test_parse_message_pack(self):
+        content = MessagePackRenderer().render({'title': 'Crème', 'ids': []})
+
+        data = MessagePackParser().parse(io.BytesIO(content))
+
+        self.assertEqual(data, {'title': 'Crème', 'ids': []})
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b'\xc1'))
+
+
+class RecipeFormatsApiTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_recipes_as_message_pack(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=30,
+            price_dolars=Decimal('12.50'),
+        )
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(res.content, raw=False)
+        self.assertEqual(data, [{
+            'id': recipe.id,
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price_dolars': '12.50',
+            'ingredients': [],
+            'tags': [],
+            'image_status': '',
+            'image_variants': {},
+        }])
+        self.assertEqual(
+            data, self.client.get(RECIPES_URL, format='json').json()
+        )
+
+    def test_create_recipe_from_message_pack(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price_dolars': '12.55',
+            'tags': [tag.id],
+            'ingredient_names': ['Tofu'],
+        }
+
+        res = self.client.post(
+            RECIPES_URL, msgpack.packb(payload),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.price_dolars, Decimal('12.55'))
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(
+            msgpack.unpackb(res.content, raw=False)['price_dolars'], '12.55'
+        )
+
+    def test_invalid_json_body(self):
+        res = self.client.post(
+            RECIPES_URL, b'{"title": ', content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,152 @@
+from unittest.mock import patch
+
+import brotli
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Tag, Ingredient, Recipe
+from recipes.cache import response_cache
+
+
+RECIPES_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+INGREDIENTS_URL = reverse("recipes:ingredient-list")
+
+
+def create_user(email, password):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5, price_dolars=3
+        )
+        self.recipe.tags.add(self.tag)
+
+    def test_list_served_from_cache(self):
+        """Test repeated list calls don't query the db"""
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        stats = response_cache.stats()
+
+        with self.assertNumQueries(0):
+            cached_res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(cached_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_res['X-Cache'], 'HIT')
+        self.assertEqual(cached_res.content, res.content)
+        self.assertEqual(response_cache.stats()['hits'], stats['hits'] + 1)
+
+    def test_query_params_cached_separately(self):
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'-{self.tag.id}'})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.json(), [])
+
+    def test_cache_invalidated_on_change(self):
+        """Test saves, deletes and m2m changes invalidate the user cache"""
+        changes = [
+            lambda: Recipe.objects.create(
+                user=self.user, title='Soup', time_minutes=5, price_dolars=3
+            ),
+            lambda: self.recipe.tags.clear(),
+            lambda: Ingredient.objects.create(user=self.user, name='Salt'),
+            lambda: self.tag.delete(),
+        ]
+        for change in changes:
+            self.client.get(RECIPES_URL)
+            self.client.get(TAGS_URL)
+            self.client.get(INGREDIENTS_URL)
+
+            change()
+
+            for url in (RECIPES_URL, TAGS_URL, INGREDIENTS_URL):
+                self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_cache_only_user_responses(self):
+        self.client.get(RECIPES_URL)
+
+        other_user = create_user(
+            email="other@gmail.com", password="other_password"
+        )
+        self.client.force_authenticate(user=other_user)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.json(), [])
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_cache_disabled(self):
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('X-Cache', res)
+
+    def test_conditional_list_served_from_cache(self):
+        """Test the ETag of a cached list is checked without the db"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_compressed_response_cached(self):
+        """Test hits are served compressed without compressing again"""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='br')
+
+        with patch(
+            'core.compression.compress', wraps=compression.compress
+        ) as compress:
+            cached_res = self.client.get(
+                RECIPES_URL, HTTP_ACCEPT_ENCODING='br'
+            )
+            other_res = self.client.get(
+                RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip'
+            )
+
+        self.assertEqual(cached_res['X-Cache'], 'HIT')
+        self.assertEqual(cached_res['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', cached_res['Vary'])
+        self.assertEqual(cached_res['ETag'], res['ETag'])
+        self.assertEqual(
+            brotli.decompress(cached_res.content),
+            self.client.get(RECIPES_URL).content
+        )
+        self.assertEqual(other_res['X-Cache'], 'MISS')
+        compress.assert_called_once()
+        self.assertEqual(compress.call_args[0][1], 'gzip')
+
+
+class ResponseCacheCommitTests(TransactionTestCase):
+
+    def test_version_bumped_on_commit(self):
+        """Test responses cached before a change is committed are dropped"""
+        user = create_user(email="test@gmail.com", password="test_password")
+
+        with transaction.atomic():
+            Tag.objects.create(user=user, name='Vegan')
+            # Read by a concurrent request, which caches the old data
+            version = response_cache.version(user.id)
+
+        self.assertNotEqual(response_cache.version(user.id), version)
@@ -0,0 +1,171 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, Tombstone
+from recipes.serializers import (
+    RecipeSerializer, TagSerializer, IngredientSerializer
+)
+
+
+SYNC_URL = reverse("recipes:sync")
+
+
+def create_user(email, password):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def sample_recipe(user, **params):
+    defaults = {
+        "title": "Simple recipe",
+        "time_minutes": 45,
+        "price_dolars": 10.00,
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicSyncAPITests(TestCase):
+
+    def test_login_required(self):
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SYNC_TOKEN_OVERLAP=0)
+class PrivateSyncAPITests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email="test@gmail.com", password="test_password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt'
+        )
+        self.recipe = sample_recipe(user=self.user)
+        self.recipe.tags.add(self.tag)
+
+    def sync(self, token=None):
+        res = self.client.get(SYNC_URL, {'token': token} if token else {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_initial_sync_returns_everything(self):
+        other_user = create_user(
+            email="other@gmail.com", password="other_password"
+        )
+        sample_recipe(user=other_user)
+
+        data = self.sync()
+
+        self.assertEqual(data['recipes'], [RecipeSerializer(self.recipe).data])
+        self.assertEqual(data['tags'], [TagSerializer(self.tag).data])
+        self.assertEqual(
+            data['ingredients'], [IngredientSerializer(self.ingredient).data]
+        )
+        self.assertEqual(
+            data['deleted'], {'recipes': [], 'tags': [], 'ingredients': []}
+        )
+
+    def test_sync_returns_only_changes(self):
+        """Test sync with a token returns only changes made after it"""
+        token = self.sync()['token']
+        later = timezone.now() + timedelta(seconds=1)
+        ingredient_id = self.ingredient.id
+
+        with patch('django.utils.timezone.now', return_value=later):
+            new_tag = Tag.objects.create(user=self.user, name='Italian')
+            self.recipe.tags.add(new_tag)
+            self.ingredient.delete()
+        data = self.sync(token)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(data['recipes'], [RecipeSerializer(self.recipe).data])
+        self.assertEqual(data['tags'], [TagSerializer(new_tag).data])
+        self.assertEqual(data['ingredients'], [])
+        self.assertEqual(data['deleted']['ingredients'], [ingredient_id])
+
+    def test_sync_without_changes_is_empty(self):
+        token = self.sync()['token']
+
+        data = self.sync(token)
+
+        self.assertEqual(data['recipes'], [])
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(data['ingredients'], [])
+
+    def test_sync_skips_recipes_of_renamed_tags(self):
+        """Test recipes holding ids of a renamed tag aren't sent again"""
+        token = self.sync()['token']
+        later = timezone.now() + timedelta(seconds=1)
+
+        with patch('django.utils.timezone.now', return_value=later):
+            self.tag.name = 'Plant based'
+            self.tag.save()
+        data = self.sync(token)
+
+        self.assertEqual(data['recipes'], [])
+        self.assertEqual(data['tags'], [TagSerializer(self.tag).data])
+        self.assertEqual(
+            list(Recipe.objects.filter(search_vector='plant')), [self.recipe]
+        )
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION=60)
+    def test_sync_token_older_than_tombstones(self):
+        """Test a full resync is required once deletions may be pruned"""
+        token = self.sync()['token']
+        later = timezone.now() + timedelta(seconds=61)
+
+        with patch('django.utils.timezone.now', return_value=later):
+            res = self.client.get(SYNC_URL, {'token': token})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+        self.assertEqual(res.data['detail'].code, 'resync_required')
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION=60)
+    def test_prune_tombstones(self):
+        recipe_id, tag_id = self.recipe.id, self.tag.id
+        self.recipe.delete()
+        later = timezone.now() + timedelta(seconds=61)
+        with patch('django.utils.timezone.now', return_value=later):
+            self.tag.delete()
+
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertTrue(Tombstone.objects.filter(object_id=recipe_id).exists())
+
+        with patch('django.utils.timezone.now', return_value=later):
+            call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(
+            list(Tombstone.objects.values_list('model', 'object_id')),
+            [('tag', tag_id)]
+        )
+
+    def test_sync_invalid_token(self):
+        res = self.client.get(SYNC_URL, {'token': 'not a token'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleting_user_removes_tombstones(self):
+        self.recipe.delete()
+        self.assertTrue(Tombstone.objects.filter(user=self.user).exists())
+
+        user_id = self.user.id
+        self.user.delete()
+
+        self.assertFalse(Tombstone.objects.filter(user_id=user_id).exists())
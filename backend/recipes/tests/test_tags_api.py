@@ -10,6 +10,7 @@ from recipes.serializers import TagSerializer
 
 
 TAGS_URL = reverse("recipes:tag-list")
+AUTOCOMPLETE_URL = reverse("recipes:tag-autocomplete")
 
 
 def create_user(email, password):
@@ -83,3 +84,55 @@ class PrivateTagsAPITests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_duplicate_tag_unsuccessful(self):
+        """Test tag names are unique per user regardless of case"""
+        Tag.objects.create(name="Vegan", user=self.user)
+        other_user = create_user("other@gmail.com", "test_password")
+        Tag.objects.create(name="Dessert", user=other_user)
+
+        res = self.client.post(TAGS_URL, {"name": "vegan"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data)
+
+        res = self.client.post(TAGS_URL, {"name": "Dessert"})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_get_or_create_tag(self):
+        """Test creating a tag with get_or_create is idempotent"""
+        tag = Tag.objects.create(name="Vegan", user=self.user)
+        url = f'{TAGS_URL}?get_or_create=true'
+
+        res = self.client.post(url, {"name": "VEGAN"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, TagSerializer(tag).data)
+
+        res = self.client.post(url, {"name": "Dessert"})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_paginate_tags(self):
+        """Test walking through tags pages with cursors"""
+        for name in ['Dessert', 'Italian', 'Mexican', 'Vegan']:
+            Tag.objects.create(name=name, user=self.user)
+        tags = Tag.objects.all().order_by('-name', '-id')
+        serializer = TagSerializer(tags, many=True)
+
+        res = self.client.get(TAGS_URL, {'page_size': 3})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data[:3])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], serializer.data[3:])
+        self.assertIsNone(res.data['next'])
+
+    def test_autocomplete_tags(self):
+        """Test completing tags limited to the requested count"""
+        Tag.objects.create(name="Vegetarian", user=self.user)
+        vegan = Tag.objects.create(name="Vegan", user=self.user)
+        Tag.objects.create(name="Dessert", user=self.user)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'VEG', 'limit': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [TagSerializer(vegan).data])
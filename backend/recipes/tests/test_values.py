@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipes.serializers import (
+    PantryRecipeSerializer, RecipeDetailSerializer, RecipeSerializer
+)
+from recipes.values import ValuesSerializer
+
+
+class ValuesSerializerTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test_password'
+        )
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.context = {'request': request}
+
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(3)
+        ]
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=30,
+            price_dolars='12.5', image_status=Recipe.IMAGE_READY,
+            image_variants={'320': {
+                'webp': 'uploads/recipes/variants/ab/320.webp',
+                'jpg': 'uploads/recipes/variants/ab/320.jpg',
+            }},
+        )
+        recipe.tags.add(tags[2], tags[0])
+        recipe.ingredients.add(*ingredients)
+        # Updated rows move to the end of the table, so related objects
+        # fetched without an ordering don't come in the order of their ids
+        for obj in (tags[0], ingredients[0]):
+            obj.save()
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=5, price_dolars=1
+        ).ingredients.add(ingredients[1])
+        Recipe.objects.create(
+            user=self.user, title='Water', time_minutes=1, price_dolars=0
+        )
+
+    def assertSameRepresentation(self, serializer_class, queryset):
+        serializer = ValuesSerializer(serializer_class, self.context)
+
+        data = serializer.to_representation(
+            serializer.values(Recipe.objects.order_by('id'))
+        )
+
+        expected = serializer_class(
+            queryset.order_by('id'), many=True, context=self.context
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(data), JSONRenderer().render(expected)
+        )
+
+    def test_same_representation_as_recipe_serializer(self):
+        """Test related ids come in the same order as from the views"""
+        self.assertSameRepresentation(
+            RecipeSerializer,
+            Recipe.objects.prefetch_related('tags', 'ingredients'),
+        )
+        self.assertSameRepresentation(RecipeSerializer, Recipe.objects.all())
+
+    def test_same_representation_as_recipe_detail_serializer(self):
+        self.assertSameRepresentation(
+            RecipeDetailSerializer,
+            Recipe.objects.prefetch_related('tags', 'ingredients'),
+        )
+
+    def test_same_representation_as_retrieve_response(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        serializer = ValuesSerializer(RecipeDetailSerializer, self.context)
+
+        for row in serializer.values(Recipe.objects.all(), 'id'):
+            res = client.get(
+                reverse('recipes:recipe-detail', args=[row['id']])
+            )
+
+            self.assertEqual(
+                res.content,
+                JSONRenderer().render(serializer.to_representation([row])[0])
+            )
+
+    def test_related_objects_aggregated_by_one_query(self):
+        serializer = ValuesSerializer(RecipeDetailSerializer, self.context)
+
+        with self.assertNumQueries(1):
+            serializer.to_representation(
+                serializer.values(Recipe.objects.all())
+            )
+
+    def test_fields_not_read_from_columns(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(PantryRecipeSerializer, self.context)
@@ -13,5 +13,6 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipes'
 
 urlpatterns = [
+    path('sync/', views.SyncView.as_view(), name='sync'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,196 @@
+import functools
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import OuterRef, Subquery
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core.asyncdb import fetch_values
+
+# Fields whose representation of a column value is the value itself
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+
+def _represent_column(field, column):
+    if type(field) in IDENTITY_FIELDS:
+        return lambda row: row[column]
+
+    to_representation = field.to_representation
+    return lambda row: None if row[column] is None \
+        else to_representation(row[column])
+
+
+def _column(field):
+    if field.source == '*' or '.' in field.source:
+        raise ImproperlyConfigured(
+            f'Field {field.field_name} is not a column, it can\'t be '
+            f'serialized from values.'
+        )
+    return field.source
+
+
+@functools.lru_cache(maxsize=None)
+def _aggregate(model, name, related_column):
+    """Return a subquery aggregating `related_column` of a many-to-many
+
+    Expressions are copied by the queries using them, so one is built per
+    column, not per serializer.
+    """
+    field = model._meta.get_field(name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    expression = f'{target}_id' if related_column == 'id' else \
+        f'{target}__{related_column}'
+
+    return Subquery(
+        through.objects
+        .filter(**{source: OuterRef('pk')})
+        .values(source)
+        .annotate(array=ArrayAgg(expression, ordering=f'{target}_id'))
+        .values('array')
+    )
+
+
+class ValuesSerializer:
+    """Read-only serializer of a model serializer's objects from values()
+
+    Produces the same representation as `serializer_class` without its per
+    object field machinery. Columns are read with `values()` and every
+    many-to-many field is aggregated by a subquery of the same query into
+    ordered arrays, of ids for a primary key field or of the columns of a
+    nested serializer. Related objects come in the order of their ids.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        serializer = serializer_class(context=context)
+        self.model = serializer.Meta.model
+        self.columns = {}
+        self.representers = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ManyRelatedField):
+                represent = self._related_ids(field)
+            elif isinstance(field, serializers.ListSerializer):
+                represent = self._related_objects(field)
+            else:
+                column = _column(field)
+                self.columns[column] = column
+                represent = _represent_column(field, column)
+            self.representers.append((name, represent))
+
+    def values(self, queryset, *fields):
+        """Return values of `queryset` to serialize and of extra `fields`"""
+        columns = dict(self.columns, **{field: field for field in fields})
+        return queryset.prefetch_related(None).values(
+            *(column for column, expression in columns.items()
+              if isinstance(expression, str)),
+            **{column: expression for column, expression in columns.items()
+               if not isinstance(expression, str)}
+        )
+
+    def to_representation(self, rows):
+        return [
+            {name: represent(row) for name, represent in self.representers}
+            for row in rows
+        ]
+
+    def _aggregate(self, name, related_column):
+        """Add a column aggregating `related_column` of a many-to-many"""
+        alias = f'{name}_{related_column}_array'
+        self.columns[alias] = _aggregate(self.model, name, related_column)
+        return alias
+
+    def _related_ids(self, field):
+        alias = self._aggregate(_column(field), 'id')
+        return lambda row: row[alias] or []
+
+    def _related_objects(self, field):
+        name = _column(field)
+        children = [
+            (child_name, self._aggregate(name, _column(child)), child)
+            for child_name, child in field.child.fields.items()
+            if not child.write_only
+        ]
+        columns = [alias for _, alias, _ in children]
+        representers = [
+            (child_name, _represent_column(child, i))
+            for i, (child_name, _, child) in enumerate(children)
+        ]
+
+        def represent(row):
+            return [
+                {child_name: represent_child(values)
+                 for child_name, represent_child in representers}
+                for values in zip(*(row[alias] or () for alias in columns))
+            ]
+        return represent
+
+
+class ValuesListMixin:
+    """List objects with a `ValuesSerializer` of the serializer class
+
+    Columns of the view's ordering are read too, for the pagination. Under
+    ASGI objects are listed and retrieved the same way, reading the values
+    without blocking the event loop.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer, rows = self.get_values()
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+        return Response(serializer.to_representation(rows))
+
+    async def async_list(self, request, *args, **kwargs):
+        serializer, rows = self.get_values()
+
+        page = None
+        if self.paginator is not None:
+            if not hasattr(self.paginator, 'async_paginate_queryset'):
+                return None
+            page = await self.paginator.async_paginate_queryset(
+                rows, request, view=self
+            )
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+        return Response(
+            serializer.to_representation(await fetch_values(rows))
+        )
+
+    async def async_retrieve(self, request, *args, **kwargs):
+        serializer, rows = self.get_values()
+
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        try:
+            rows = rows.filter(**{self.lookup_field: kwargs[lookup]})
+        except (TypeError, ValueError, ValidationError):
+            return None
+        rows = await fetch_values(rows[:1])
+        if not rows:
+            # Not found, answered by the synchronous view
+            return None
+        return Response(serializer.to_representation(rows)[0])
+
+    def get_values(self):
+        """Return the values serializer and values of the view's objects"""
+        serializer = ValuesSerializer(
+            self.get_serializer_class(), self.get_serializer_context()
+        )
+        rows = serializer.values(
+            self.filter_queryset(self.get_queryset()),
+            *(field.lstrip('-') for field in self.get_ordering())
+        )
+        return serializer, rows
@@ -1,86 +1,360 @@
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Upper
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
-from recipes import serializers
+from core.async_views import AsyncViewMixin
+from core.models import Tag, Ingredient, Recipe, Tombstone
+from recipes import (
+    autocomplete, filters, images, renderers, serializers, sync
+)
+from recipes.bulk import BulkModelMixin
+from recipes.cache import CachedListMixin
+from recipes.conditional import ConditionalRecipeMixin
+from recipes.export import export_lines
+from recipes.names import upper_names
+from recipes.pagination import KeysetPagination
+from recipes.pantry import indexes as pantry_indexes
+from recipes.values import ValuesListMixin, ValuesSerializer
+from users.authentication import HashedTokenAuthentication
 
 
 class BaseRecipeAttributeViewSet(
-    viewsets.GenericViewSet, mixins.CreateModelMixin, mixins.ListModelMixin
+    AsyncViewMixin,
+    CachedListMixin,
+    BulkModelMixin,
+    ValuesListMixin,
+    viewsets.GenericViewSet,
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
 ):
 
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (HashedTokenAuthentication,)
+    pagination_class = KeysetPagination
+    ordering = ('-name', '-id')
+    autocomplete_max_limit = 100
+
+    def get_ordering(self):
+        return self.ordering
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by("-name")
+        return self.queryset.filter(user=self.request.user).order_by(
+            *self.get_ordering()
+        )
+
+    def create(self, request, *args, **kwargs):
+        """Create an object, with `get_or_create` return the existing one
+
+        Names are unique per user regardless of case.
+        """
+        get_or_create = request.query_params.get('get_or_create')
+        name = request.data.get('name')
+        if get_or_create in ('1', 'true') and isinstance(name, str):
+            existing = self.queryset \
+                .filter(user=request.user, name__iexact=name.strip()) \
+                .first()
+            if existing is not None:
+                serializer = self.get_serializer(existing)
+                return Response(
+                    data=serializer.data, status=status.HTTP_200_OK
+                )
+
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # Lost a race with a request creating the same name
+            raise ValidationError({'name': [
+                f'{self.queryset.model._meta.verbose_name.capitalize()} '
+                f'with this name already exists.'
+            ]})
+
+    def get_bulk_serializer_context(self, items):
+        context = super().get_bulk_serializer_context(items)
+        # Upper cased like the unique indexes do, by the database
+        context['name_keys'] = upper_names(
+            item['name'].strip() for item in items
+            if isinstance(item, dict) and isinstance(item.get('name'), str)
+        )
+        context['existing_names'] = dict(
+            self.queryset.filter(user=self.request.user)
+            .annotate(upper_name=Upper('name'))
+            .filter(upper_name__in=context['name_keys'].values())
+            .values_list('upper_name', 'id')
+        )
+        return context
+
+    def perform_bulk_write(self, objects, created):
+        if not created:
+            recipe_ids = self.queryset.model.objects \
+                .filter(pk__in=[obj.pk for obj in objects]) \
+                .values('recipe')
+            Recipe.objects.filter(pk__in=recipe_ids).update_search_vector()
+        super().perform_bulk_write(objects, created)
+
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """List names best completing the typed text, typos tolerated"""
+        limit = filters.parse_bounded_int(
+            request.query_params.get('limit'), 'limit',
+            default=10, max_value=self.autocomplete_max_limit
+        )
+        trie = self.autocomplete_indexes.get(request.user.id)
+        matches = trie.complete(request.query_params.get('q', ''), limit)
+
+        serializer = self.get_serializer(
+            [self.queryset.model(id=id_, name=name) for id_, name in matches],
+            many=True,
+        )
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
 
 
 class TagViewSet(BaseRecipeAttributeViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    autocomplete_indexes = autocomplete.tag_indexes
 
 
 class IngredientViewSet(BaseRecipeAttributeViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    autocomplete_indexes = autocomplete.ingredient_indexes
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    AsyncViewMixin,
+    CachedListMixin,
+    ConditionalRecipeMixin,
+    BulkModelMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
 
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
 
     permission_classes = (IsAuthenticated, )
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (HashedTokenAuthentication, )
+    pagination_class = KeysetPagination
+    ordering = ('-title', '-id')
+    search_ordering = ('-rank', '-id')
+    pantry_max_missing = 5
+    pantry_max_limit = 500
+    export_chunk_size = 1000
+    related_fields = ('tags', 'ingredients')
+    sparse_actions = ('list', 'retrieve')
 
-    def _query_param_to_ints(self, qp):
-        return [int(str_id) for str_id in qp.split(',')]
+    def get_ordering(self):
+        if self.request.query_params.get('search'):
+            return self.search_ordering
+        return self.ordering
 
     def get_queryset(self):
+        qp_search = self.request.query_params.get('search')
         qp_tags = self.request.query_params.get('tags')
         qp_ingredients = self.request.query_params.get('ingredients')
+        match = filters.parse_match(self.request.query_params.get('match'))
 
         queryset = self.queryset
         if qp_tags:
-            tag_ids = self._query_param_to_ints(qp_tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = filters.filter_related(
+                queryset, Recipe.tags.through, 'tag_id',
+                *filters.parse_ids(qp_tags, 'tags'), match
+            )
         if qp_ingredients:
-            ingredient_ids = self._query_param_to_ints(qp_ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = filters.filter_related(
+                queryset, Recipe.ingredients.through, 'ingredient_id',
+                *filters.parse_ids(qp_ingredients, 'ingredients'), match
+            )
+
+        if qp_search:
+            queryset = filters.search(queryset, qp_search)
+
+        related = self.related_fields
+        fields = self.get_sparse_fieldsets().get('fields')
+        if fields is not None:
+            related = [name for name in related if name in fields]
+            queryset = queryset.only('id', *(
+                name for name in fields if name not in self.related_fields
+            ))
+
+        return queryset.filter(user=self.request.user).order_by(
+            *self.get_ordering()
+        ).prefetch_related(*related)
+
+    def get_sparse_fieldsets(self):
+        """Return the `fields` and `expand` of a read request, if given"""
+        if self.action not in self.sparse_actions:
+            return {}
+
+        query_params = self.request.query_params
+        serializer_class = self.get_serializer_class()
+        fieldsets = {}
+        if query_params.get('fields'):
+            readable = [
+                name for name, field in serializer_class().fields.items()
+                if not field.write_only
+            ]
+            fieldsets['fields'] = filters.parse_names(
+                query_params['fields'], 'fields', readable
+            )
+        if query_params.get('expand'):
+            fieldsets['expand'] = filters.parse_names(
+                query_params['expand'], 'expand',
+                list(serializer_class.expandable_fields)
+            )
 
-        return queryset.filter(user=self.request.user).order_by('-title')
+        return fieldsets
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(self.get_sparse_fieldsets())
+        return context
 
     def get_serializer_class(self):
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'export'):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'pantry':
+            return serializers.PantryRecipeSerializer
         else:
             return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def prepare_bulk_data(self, data):
+        self.get_serializer_class().resolve_names(data, self.request.user)
+
+    def perform_bulk_write(self, objects, created):
+        Recipe.objects.filter(pk__in=[obj.pk for obj in objects]) \
+            .update_search_vector()
+        super().perform_bulk_write(objects, created)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to recipe"""
+        """Upload an image to recipe, its variants are generated later"""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(
+                image_status=Recipe.IMAGE_PROCESSING, image_variants={}
+            )
+            images.process_image(recipe)
+            # Variants shared with another recipe or generated inline are
+            # saved already
+            recipe.refresh_from_db(fields=['image_status', 'image_variants'])
             res = Response(data=serializer.data, status=status.HTTP_200_OK)
         else:
             res = Response(
                 data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         return res
+
+    @action(methods=['GET'], detail=False)
+    def pantry(self, request):
+        """List recipes which can be cooked from the given ingredients"""
+        qp_ingredients = request.query_params.get('ingredients', '')
+        pantry, excluded = filters.parse_ids(qp_ingredients, 'ingredients') \
+            if qp_ingredients else (set(), set())
+        if excluded:
+            raise ValidationError(
+                {'ingredients': 'Excluded ids are not supported.'}
+            )
+        max_missing = filters.parse_bounded_int(
+            request.query_params.get('max_missing'), 'max_missing',
+            default=2, max_value=self.pantry_max_missing
+        )
+        limit = filters.parse_bounded_int(
+            request.query_params.get('limit'), 'limit',
+            default=50, max_value=self.pantry_max_limit
+        )
+
+        index = pantry_indexes.get(request.user.id)
+        matches = index.match(pantry, max_missing, limit)
+        recipes = Recipe.objects.filter(user=request.user) \
+            .prefetch_related('tags', 'ingredients') \
+            .in_bulk([recipe_id for recipe_id, _ in matches])
+
+        context = self.get_serializer_context()
+        context['missing_ingredients'] = dict(matches)
+        serializer = self.get_serializer_class()(
+            [recipes[recipe_id] for recipe_id, _ in matches
+             if recipe_id in recipes],
+            many=True,
+            context=context,
+        )
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=[
+            renderers.NDJSONRenderer, renderers.JSONLinesRenderer
+        ],
+    )
+    def export(self, request):
+        """Stream all user's recipes as JSON lines"""
+        queryset = self.queryset.filter(user=request.user).order_by('id')
+        serializer = ValuesSerializer(
+            self.get_serializer_class(), self.get_serializer_context()
+        )
+        response = StreamingHttpResponse(
+            export_lines(
+                serializer.values(queryset),
+                serializer,
+                self.export_chunk_size,
+            ),
+            content_type=request.accepted_media_type,
+        )
+        filename = f'recipes.{request.accepted_renderer.format}'
+        response['Content-Disposition'] = \
+            f'attachment; filename="{filename}"'
+        return response
+
+
+class SyncView(APIView):
+    """List user's records changed since the given sync token"""
+
+    permission_classes = (IsAuthenticated, )
+    authentication_classes = (HashedTokenAuthentication, )
+
+    def get(self, request):
+        token = request.query_params.get('token')
+        since = sync.parse_token(token) if token else None
+        synced_at = timezone.now()
+
+        recipes, tags, ingredients, tombstones = sync.changes(
+            request.user, since
+        )
+        deleted = {model: [] for model, _ in Tombstone.MODEL_CHOICES}
+        for model, object_id in tombstones:
+            deleted[model].append(object_id)
+
+        return Response(data={
+            'token': sync.make_token(synced_at),
+            'recipes': serializers.RecipeSerializer(recipes, many=True).data,
+            'tags': serializers.TagSerializer(tags, many=True).data,
+            'ingredients': serializers.IngredientSerializer(
+                ingredients, many=True
+            ).data,
+            'deleted': {
+                'recipes': deleted[Tombstone.RECIPE],
+                'tags': deleted[Tombstone.TAG],
+                'ingredients': deleted[Tombstone.INGREDIENT],
+            },
+        }, status=status.HTTP_200_OK)
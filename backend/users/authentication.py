@@ -0,0 +1,216 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication, get_authorization_header
+)
+
+from core.models import AuthToken, hash_token_key
+
+
+class TokenCache:
+    """Bounded in-process cache of token lookups
+
+    Entries live AUTH_TOKEN_CACHE_TIMEOUT seconds at most and the least
+    recently used ones are evicted past AUTH_TOKEN_CACHE_MAX_SIZE. Every
+    entry records the version of its user, kept in the default cache that
+    all the processes share, so bumping it on logout, rotation or
+    deactivation invalidates the entries of all of them, not only of the
+    one handling the change. The version is read on the first use of an
+    entry and then once per AUTH_TOKEN_VERSION_CHECK_INTERVAL seconds, so
+    most hits don't leave the process. Other processes may thus accept a
+    revoked token for that long.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def version(self, user_id):
+        key = f'auth-version:{user_id}'
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+
+        return version
+
+    def get(self, key_hash):
+        """Return the token and its user cached by the hash, if still valid"""
+        entry = self._entry(key_hash)
+        if entry is None:
+            return None
+        if entry['check_at'] <= time.monotonic() and not self._check(
+            key_hash, entry, self.version(entry['user_id'])
+        ):
+            return None
+
+        return self._token(key_hash, entry)
+
+    async def async_get(self, key_hash):
+        """Like `get`, the shared cache is read outside of the event loop"""
+        entry = self._entry(key_hash)
+        if entry is None:
+            return None
+        if entry['check_at'] <= time.monotonic() and not self._check(
+            key_hash,
+            entry,
+            await sync_to_async(self.version)(entry['user_id']),
+        ):
+            return None
+
+        return self._token(key_hash, entry)
+
+    def _check(self, key_hash, entry, version):
+        """Drop the entry if `version` isn't its own, else delay next check"""
+        if entry['version'] != version:
+            self.invalidate(key_hash)
+            return False
+
+        entry['check_at'] = time.monotonic() + \
+            settings.AUTH_TOKEN_VERSION_CHECK_INTERVAL
+        return True
+
+    def _entry(self, key_hash):
+        with self.lock:
+            entry = self.entries.get(key_hash)
+            if entry is None:
+                return None
+            if entry['deadline'] <= time.monotonic():
+                del self.entries[key_hash]
+                return None
+            self.entries.move_to_end(key_hash)
+
+        return entry
+
+    def _token(self, key_hash, entry):
+        User = get_user_model()
+        user = User.from_db(
+            'default', entry['user_fields'], entry['user_values']
+        )
+        token = AuthToken(
+            id=entry['token_id'],
+            key_hash=key_hash,
+            user_id=entry['user_id'],
+            expires_at=entry['expires_at'],
+        )
+        token.user = user
+        return token
+
+    def set(self, token, version):
+        """Cache a token and its user, as of `version` of the user"""
+        fields = [field.attname for field in token.user._meta.concrete_fields]
+        entry = {
+            'deadline': time.monotonic() + settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            'version': version,
+            # The version may have changed since it was read
+            'check_at': 0,
+            'token_id': token.id,
+            'user_id': token.user_id,
+            'expires_at': token.expires_at,
+            'user_fields': fields,
+            'user_values': [getattr(token.user, name) for name in fields],
+        }
+        with self.lock:
+            self.entries[token.key_hash] = entry
+            self.entries.move_to_end(token.key_hash)
+            while len(self.entries) > settings.AUTH_TOKEN_CACHE_MAX_SIZE:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key_hash):
+        with self.lock:
+            self.entries.pop(key_hash, None)
+
+    def invalidate_user(self, user_id):
+        """Invalidate cached tokens of the user in every process
+
+        Entries of this process are dropped at once, other processes drop
+        theirs on their next check of the version.
+        """
+        cache.set(f'auth-version:{user_id}', uuid.uuid4().hex, None)
+        with self.lock:
+            for key_hash in [
+                key_hash for key_hash, entry in self.entries.items()
+                if entry['user_id'] == user_id
+            ]:
+                del self.entries[key_hash]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class HashedTokenAuthentication(TokenAuthentication):
+    """Authentication by expiring tokens, which are stored hashed
+
+    Clients send the key as `Authorization: Token <key>`, like with
+    TokenAuthentication. Lookups are cached by `token_cache`.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        key_hash = hash_token_key(key)
+        token = token_cache.get(key_hash)
+        if token is None:
+            user_id = AuthToken.objects \
+                .filter(key_hash=key_hash) \
+                .values_list('user_id', flat=True) \
+                .first()
+            if user_id is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            # Read before the token and its user, so the entry of rows
+            # changed meanwhile is dropped by the bump of the change
+            version = token_cache.version(user_id)
+            try:
+                token = AuthToken.objects.select_related('user').get(
+                    key_hash=key_hash
+                )
+            except AuthToken.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if token.has_expired():
+                token.delete()
+                raise exceptions.AuthenticationFailed(_('Token has expired.'))
+            if token.user.is_active:
+                token_cache.set(token, version)
+        elif token.has_expired():
+            token_cache.invalidate(key_hash)
+            AuthToken.objects.filter(id=token.id).delete()
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return (token.user, token)
+
+    async def authenticate_cached(self, request):
+        """Authenticate by a cached token only, never reading the database
+
+        Returns None when the token isn't cached, has expired or belongs
+        to an inactive user, `authenticate` then decides.
+        """
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            return None
+
+        token = await token_cache.async_get(hash_token_key(key))
+        if token is None or token.has_expired() or \
+                not token.user.is_active:
+            return None
+        return (token.user, token)
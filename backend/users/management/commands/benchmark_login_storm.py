@@ -0,0 +1,144 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import hashers
+from core.models import AuthToken
+from recipes.management.commands.benchmark_serializers import create_recipes
+from users.views import CreateAuthTokenView
+
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TOKEN_URL = reverse('users:token')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[round(fraction * (len(values) - 1))]
+
+
+class Storm:
+    """Threads logging in again and again, until stopped"""
+
+    def __init__(self, emails, password, concurrency):
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.logins = 0
+        self.threads = [
+            threading.Thread(
+                target=self.login, args=(emails[i::concurrency], password)
+            )
+            for i in range(concurrency)
+        ]
+
+    def login(self, emails, password):
+        client = Client(HTTP_HOST='localhost')
+        try:
+            while not self.stop_event.is_set():
+                for email in emails:
+                    res = client.post(
+                        TOKEN_URL, {'email': email, 'password': password}
+                    )
+                    assert res.status_code == 200, res.content
+                    with self.lock:
+                        self.logins += 1
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+
+
+class Command(BaseCommand):
+    """Command that measures recipe list latency during a login storm
+
+    Logins are made by concurrent threads, with passwords hashed inline
+    and then by the hashing pool, while the recipe list is requested.
+    Login throttling and the response cache are turned off, so every login
+    hashes a password and every list is read from the database. The data
+    is committed, for the threads to see it, and deleted at the end.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Number of threads logging in',
+        )
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        prefix = f'benchmark-{uuid.uuid4().hex}'
+        User = get_user_model()
+        emails = [
+            f'{prefix}-{i}@example.com'
+            for i in range(options['concurrency'])
+        ]
+        throttle_classes = CreateAuthTokenView.throttle_classes
+        CreateAuthTokenView.throttle_classes = ()
+        try:
+            user = User.objects.create_user(email=f'{prefix}@example.com')
+            User.objects.bulk_create(
+                User(email=email, password=make_password(password))
+                for email in emails
+            )
+            create_recipes(user, options['rows'], 3)
+            token, key = AuthToken.objects.create_token(user)
+            client = Client(
+                HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Token {key}'
+            )
+
+            def measure(title, storm=None):
+                latencies = []
+                start = time.perf_counter()
+                for _ in range(options['requests']):
+                    request_start = time.perf_counter()
+                    res = client.get(RECIPES_URL)
+                    latencies.append(time.perf_counter() - request_start)
+                    assert res.status_code == 200, res.content
+                elapsed = time.perf_counter() - start
+                logins = ''
+                if storm is not None:
+                    logins = f', {storm.logins / elapsed:.1f} logins/s'
+                self.stdout.write(
+                    f'{title}: recipe list p50 '
+                    f'{statistics.median(latencies) * 1000:.1f} ms, p95 '
+                    f'{percentile(latencies, 0.95) * 1000:.1f} ms{logins}'
+                )
+
+            with override_settings(RESPONSE_CACHE_ENABLED=False):
+                measure('No logins')
+
+                with override_settings(PASSWORD_HASHING_WORKERS=0), \
+                        Storm(emails, password, options['concurrency']) as s:
+                    measure('Login storm, hashed inline', s)
+
+                workers = settings.PASSWORD_HASHING_WORKERS or 1
+                with override_settings(PASSWORD_HASHING_WORKERS=workers):
+                    # Start the pool before measuring
+                    hashers.make_password(password)
+                    with Storm(emails, password, options['concurrency']) \
+                            as s:
+                        measure(
+                            f'Login storm, hashed by {workers} workers', s
+                        )
+        finally:
+            CreateAuthTokenView.throttle_classes = throttle_classes
+            User.objects.filter(email__startswith=prefix).delete()
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import AuthToken
+from users.authentication import token_cache
+
+
+def invalidate_user_tokens(user_id):
+    """Invalidate cached tokens of the user now and once committed
+
+    Another process may read the old row and cache it until the change
+    is committed, the second bump drops what it cached meanwhile.
+    """
+    token_cache.invalidate_user(user_id)
+    transaction.on_commit(lambda: token_cache.invalidate_user(user_id))
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_tokens_of_changed_user(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def invalidate_tokens_of_deleted_user(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key_hash)
+    invalidate_user_tokens(instance.user_id)
@@ -0,0 +1,228 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuthToken, hash_token_key
+from users.authentication import token_cache
+
+
+TOKEN_URL = reverse('users:token')
+ROTATE_URL = reverse('users:token-rotate')
+LOGOUT_URL = reverse('users:logout')
+ME_URL = reverse('users:me')
+
+
+class HashedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test_password', name='Test'
+        )
+        self.client = APIClient()
+        res = self.client.post(
+            TOKEN_URL, {'email': 'test@gmail.com', 'password': 'test_password'}
+        )
+        self.key = res.data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+
+    def test_token_stored_hashed(self):
+        token = AuthToken.objects.get(user=self.user)
+
+        self.assertEqual(token.key_hash, hash_token_key(self.key))
+        self.assertFalse(
+            AuthToken.objects.filter(key_hash=self.key).exists()
+        )
+        self.assertGreater(token.expires_at, timezone.now())
+
+    def test_authenticate(self):
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'test@gmail.com')
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_rejected_and_deleted(self):
+        AuthToken.objects.filter(user=self.user).update(
+            expires_at=timezone.now()
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(AuthToken.objects.filter(user=self.user).exists())
+
+    def test_cached_lookup_reads_no_token(self):
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'test@gmail.com')
+
+    def test_cached_lookup_checks_version_once_per_interval(self):
+        """Test hits don't read the shared cache until a check is due"""
+        self.client.get(ME_URL)
+
+        with patch.object(cache, 'get', wraps=cache.get) as cache_get:
+            self.client.get(ME_URL)
+            self.client.get(ME_URL)
+
+        # The version may have changed before the entry was cached
+        self.assertEqual(cache_get.call_count, 1)
+
+    @override_settings(AUTH_TOKEN_VERSION_CHECK_INTERVAL=0)
+    def test_change_of_other_process_applied_on_next_check(self):
+        self.client.get(ME_URL)
+        self.client.get(ME_URL)
+
+        # Bumped by another process, which can't drop these entries
+        cache.set(f'auth-version:{self.user.id}', 'other', None)
+
+        # The token and its user are read again
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TOKEN_CACHE_MAX_SIZE=1)
+    def test_cache_bounded(self):
+        other = get_user_model().objects.create_user(email='other@gmail.com')
+        other_token, _ = AuthToken.objects.create_token(other)
+        token = AuthToken.objects.select_related('user').get(user=self.user)
+        version = token_cache.version(self.user.id)
+
+        token_cache.set(token, version)
+        token_cache.set(other_token, token_cache.version(other.id))
+
+        self.assertIsNone(token_cache.get(token.key_hash))
+        self.assertIsNotNone(token_cache.get(other_token.key_hash))
+
+    @override_settings(AUTH_TOKEN_CACHE_TIMEOUT=0)
+    def test_cache_entries_expire(self):
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(2):
+            self.client.get(ME_URL)
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get(ME_URL)
+
+        res = self.client.post(LOGOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(AuthToken.objects.filter(user=self.user).exists())
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotation_replaces_token(self):
+        self.client.get(ME_URL)
+
+        res = self.client.post(ROTATE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.key)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {res.data["token"]}'
+        )
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_deactivation_invalidates_cached_token(self):
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stale_entry_of_other_process_invalidated(self):
+        token = AuthToken.objects.select_related('user').get(user=self.user)
+        version = token_cache.version(self.user.id)
+
+        AuthToken.objects.filter(id=token.id).delete()
+        # Entry another process cached before the deletion
+        token_cache.set(token, version)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_change_committed_during_lookup_not_cached(self):
+        """Test a token read before its user changed isn't kept cached"""
+        changed = []
+
+        def deactivate_after_read(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if 'JOIN' in sql and not changed:
+                changed.append(True)
+                # Committed by another request right after the read
+                get_user_model().objects \
+                    .filter(id=self.user.id) \
+                    .update(is_active=False)
+                token_cache.invalidate_user(self.user.id)
+            return result
+
+        with connection.execute_wrapper(deactivate_after_read):
+            self.client.get(ME_URL)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthTokenMigrationTests(TransactionTestCase):
+
+    migrate_from = [
+        ('core', '0015_unique_names'),
+        ('authtoken', '0002_auto_20160226_1747'),
+    ]
+    migrate_to = [('core', '0016_auth_token')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_existing_tokens_kept_hashed(self):
+        """Test clients keep their plaintext tokens, which are hashed"""
+        apps = self.migrate(self.migrate_from)
+        user = apps.get_model('core', 'User').objects.create(
+            email='test@gmail.com'
+        )
+        token = apps.get_model('authtoken', 'Token').objects.create(
+            key='a' * 40, user_id=user.id
+        )
+
+        self.migrate(self.migrate_to)
+
+        self.assertEqual(
+            list(AuthToken.objects.values_list('key_hash', 'user_id')),
+            [(hash_token_key(token.key), user.id)]
+        )
+        client = APIClient(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(client.get(ME_URL).status_code, status.HTTP_200_OK)
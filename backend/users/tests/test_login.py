@@ -0,0 +1,148 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+
+TOKEN_URL = reverse('users:token')
+ME_URL = reverse('users:me')
+
+
+class PasswordHashingTests(TestCase):
+
+    def test_hashed_by_pool(self):
+        with override_settings(PASSWORD_HASHING_WORKERS=1):
+            encoded = hashers.make_password('test_password')
+
+            self.assertIsNotNone(hashers.get_executor())
+            self.assertTrue(encoded.startswith('pbkdf2_sha256$180000$'))
+            self.assertTrue(hashers.check_password('test_password', encoded))
+            self.assertFalse(hashers.check_password('wrong', encoded))
+
+    def test_hashed_inline(self):
+        with override_settings(PASSWORD_HASHING_WORKERS=0):
+            self.assertIsNone(hashers.get_executor())
+            user = get_user_model().objects.create_user(
+                email='test@gmail.com', password='test_password'
+            )
+
+        self.assertTrue(user.check_password('test_password'))
+
+    def test_unusable_password(self):
+        user = get_user_model().objects.create_user(email='test@gmail.com')
+
+        self.assertFalse(user.has_usable_password())
+        self.assertFalse(user.check_password(None))
+        self.assertFalse(user.check_password(''))
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class PasswordHashUpgradeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.payload = {'email': 'test@gmail.com', 'password': 'test_password'}
+
+    def create_user(self, encoded):
+        return get_user_model().objects.create(
+            email='test@gmail.com', password=encoded
+        )
+
+    def test_hash_upgraded_to_current_iterations(self):
+        user = self.create_user(
+            make_password('test_password', hasher='pbkdf2_sha256')
+        )
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=200000):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$200000$'))
+
+    def test_hash_upgraded_from_other_hasher(self):
+        user = self.create_user(
+            make_password('test_password', hasher='pbkdf2_sha1')
+        )
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$180000$'))
+
+    def test_hash_not_upgraded_on_wrong_password(self):
+        encoded = make_password('test_password', hasher='pbkdf2_sha1')
+        user = self.create_user(encoded)
+
+        self.client.post(
+            TOKEN_URL, {'email': 'test@gmail.com', 'password': 'wrong'}
+        )
+
+        user.refresh_from_db()
+        self.assertEqual(user.password, encoded)
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        get_user_model().objects.create_user(
+            email='test@gmail.com', password='test_password'
+        )
+
+    def login(self, email, password='wrong', ip='127.0.0.1', **headers):
+        return self.client.post(
+            TOKEN_URL, {'email': email, 'password': password},
+            REMOTE_ADDR=ip, **headers
+        )
+
+    def test_account_throttled_from_any_ip(self):
+        for i in range(10):
+            self.login('test@gmail.com', ip=f'10.0.0.{i}')
+
+        res = self.login('TEST@gmail.com', 'test_password', ip='10.0.1.1')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = self.login('other@gmail.com', ip='10.0.1.1')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ip_throttled_across_accounts(self):
+        for i in range(30):
+            self.login(f'user{i}@gmail.com')
+
+        res = self.login('test@gmail.com', 'test_password')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = self.login('test@gmail.com', 'test_password', ip='10.0.0.1')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_ip_throttle_ignores_forwarded_for(self):
+        """Test clients can't evade the IP throttle by a forged header"""
+        for i in range(30):
+            self.login(
+                f'user{i}@gmail.com', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}'
+            )
+
+        res = self.login(
+            'test@gmail.com', 'test_password',
+            HTTP_X_FORWARDED_FOR='10.0.1.1',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_throttled_attempt_not_hashed(self):
+        for i in range(10):
+            self.login('test@gmail.com', ip=f'10.0.0.{i}')
+
+        with self.assertNumQueries(0):
+            self.login('test@gmail.com', 'test_password', ip='10.0.1.1')
@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -19,6 +20,8 @@ class PublicUserApiTests(TestCase):
     """Test the public user API"""
 
     def setUp(self):
+        # Forget login attempts throttled by earlier tests
+        cache.clear()
         self.client = APIClient()
 
     def test_create_user_succesful(self):
@@ -0,0 +1,35 @@
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPThrottle(SimpleRateThrottle):
+    """Throttle login attempts by client IP
+
+    The IP is REMOTE_ADDR, or with NUM_PROXIES proxies the address the
+    outermost one saw, read from X-Forwarded-For.
+    """
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginAccountThrottle(SimpleRateThrottle):
+    """Throttle login attempts by account, whichever IPs they come from"""
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if isinstance(data, dict) else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+
+        # Hashed to bound the length of keys
+        ident = hashlib.sha256(
+            email.strip().lower().encode('utf-8')
+        ).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
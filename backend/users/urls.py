@@ -9,4 +9,9 @@ urlpatterns = [
     path('me/', views.ManageUserView.as_view(), name='me'),
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateAuthTokenView.as_view(), name='token'),
+    path(
+        'token/rotate/', views.RotateAuthTokenView.as_view(),
+        name='token-rotate',
+    ),
+    path('logout/', views.LogoutView.as_view(), name='logout'),
 ]
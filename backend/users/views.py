@@ -1,8 +1,18 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from core.async_views import AsyncViewMixin
+from core.models import AuthToken
+from users.authentication import HashedTokenAuthentication
 from users.serializers import UserSerializer, AuthTokenSerializer
+from users.throttles import LoginAccountThrottle, LoginIPThrottle
+
+
+def token_response(token, key):
+    return Response({'token': key, 'expires_at': token.expires_at})
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -10,17 +20,52 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(AsyncViewMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (HashedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         return self.request.user
 
+    async def async_get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_object()).data)
+
 
 class CreateAuthTokenView(ObtainAuthToken):
     """Create a new authentication token"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginIPThrottle, LoginAccountThrottle)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        token, key = AuthToken.objects.create_token(
+            serializer.validated_data['user']
+        )
+        return token_response(token, key)
+
+
+class RotateAuthTokenView(APIView):
+    """Replace the authentication token by a new one"""
+    authentication_classes = (HashedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        token, key = AuthToken.objects.create_token(request.user)
+        request.auth.delete()
+        return token_response(token, key)
+
+
+class LogoutView(APIView):
+    """Delete the authentication token"""
+    authentication_classes = (HashedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)